@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -52,13 +53,19 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Сжатие ответов gzip (выключено по умолчанию: при HTTPS сжатие страниц
+# с CSRF-токеном открывает возможность атаки BREACH)
+GZIP_RESPONSES = False
+
+if GZIP_RESPONSES:
+    MIDDLEWARE.insert(0, 'django.middleware.gzip.GZipMiddleware')
+
 ROOT_URLCONF = 'taskflow.urls'
 
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -66,6 +73,14 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Кэширующий загрузчик включён явно, в том числе при DEBUG = False:
+            # шаблон карточки компилируется один раз на процесс.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -83,6 +98,26 @@ DATABASES = {
     }
 }
 
+# Шардирование задач по пользователям: задачи каждого пользователя хранятся
+# в одной из баз TASK_SHARDS. Пользователи, сессии и служебные таблицы
+# остаются в базе default.
+TASK_SHARD_COUNT = int(os.environ.get('TASKFLOW_TASK_SHARDS', 1))
+
+for shard_index in range(1, TASK_SHARD_COUNT):
+    DATABASES[f'shard_{shard_index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'shard_{shard_index}.sqlite3',
+    }
+
+TASK_SHARDS = ['default'] + [
+    f'shard_{shard_index}' for shard_index in range(1, TASK_SHARD_COUNT)
+]
+TASK_SHARD_ID_STRIDE = 10 ** 12
+# Идентификаторы задач берутся из общего счётчика блоками на процесс
+TASK_ID_BLOCK_SIZE = 100
+TASK_SHARD_CACHE_SECONDS = 300
+DATABASE_ROUTERS = ['tasks.routers.TaskShardRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -133,3 +168,79 @@ CRISPY_TEMPLATE_PACK = 'bootstrap5'
 
 LOGIN_URL = 'auth'
 LOGOUT_URL = 'logout'
+
+# Сессии читаются из кэша (база используется только при промахе), а
+# пользователь кэшируется в памяти процесса на AUTH_USER_CACHE_SECONDS.
+# Сигналы сбрасывают кэш при смене пароля и прав в текущем процессе,
+# остальные процессы увидят изменения не позже чем через TTL.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTHENTICATION_BACKENDS = ['tasks.auth.CachedModelBackend']
+AUTH_USER_CACHE_SECONDS = 30
+AUTH_USER_CACHE_SIZE = 10000
+
+# Архивация выполненных задач
+TASK_ARCHIVE_AFTER_DAYS = 90
+TASK_ARCHIVE_BATCH_SIZE = 1000
+
+# Фоновый экспорт задач
+EXPORT_ROOT = BASE_DIR / 'exports'
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_JOB_MAX_ACTIVE = 3
+EXPORT_JOB_USER_CONCURRENCY = 1
+EXPORT_JOB_STALE_SECONDS = 300
+
+# Производительность административной панели
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
+ADMIN_DATE_HIERARCHY_CACHE_SECONDS = 300
+ADMIN_BULK_ACTION_BATCH_SIZE = 500
+
+# Напоминания о сроках задач
+REMINDER_LEAD_MINUTES = 60
+REMINDER_WINDOW_HOURS = 6
+REMINDER_BATCH_SIZE = 500
+REMINDER_OUTBOX = 'tasks.reminders.DatabaseOutbox'
+REMINDER_FILE_OUTBOX_PATH = BASE_DIR / 'reminders.jsonl'
+
+# Дельта-синхронизация клиентов
+TASK_SYNC_PAGE_SIZE = 500
+TASK_SYNC_BATCH_SIZE = 500
+TASK_SYNC_TOMBSTONE_DAYS = 30
+
+# Аналитика потока задач
+ANALYTICS_FLOW_DAYS = 30
+ANALYTICS_PERCENTILES = (50, 85, 95)
+ANALYTICS_STREAM_CHUNK_SIZE = 2000
+
+# Мягкое удаление и фоновая очистка
+TASK_DELETE_GRACE_SECONDS = 600
+USER_DELETE_GRACE_SECONDS = 24 * 60 * 60
+USER_PURGE_STALE_SECONDS = 600
+TASK_PURGE_BATCH_SIZE = 1000
+TASK_PURGE_PAUSE_SECONDS = 0.05
+
+# Поиск похожих задач (MinHash LSH по леммам названия)
+DUPLICATE_MINHASH_PERMUTATIONS = 64
+DUPLICATE_LSH_BANDS = 16
+DUPLICATE_SIMILARITY_THRESHOLD = 0.5
+DUPLICATE_MAX_CANDIDATES = 50
+DUPLICATE_MAX_RESULTS = 5
+DUPLICATE_INDEX_BATCH_SIZE = 5000
+
+# Правила приоритета (проверка новой версии правил в каждом процессе)
+PRIORITY_RULES_CHECK_SECONDS = 5
+
+# Нагрузочное тестирование (manage.py loadtest): доли сценариев и SLO
+LOADTEST_MIX = {
+    'dashboard': 40,
+    'status': 25,
+    'list': 20,
+    'analytics': 10,
+    'export': 5,
+}
+LOADTEST_SLO_P95_MS = 500
+LOADTEST_SLO_P99_MS = 1500
+LOADTEST_MAX_ERROR_RATE = 0.01
+
+# Снимок доски задач в памяти процесса (LRU по пользователям)
+BOARD_SNAPSHOT_MAX_USERS = 1000
+BOARD_SNAPSHOT_MAX_TASKS = 5000
@@ -1,11 +1,142 @@
+from collections import defaultdict
+
 from django import forms
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.admin.widgets import AdminSplitDateTime
+from django.contrib.auth import get_permission_codename
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, models, transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
-from .models import Task
+from .board import invalidate_boards
+from .history import record_queryset_transitions
+from .models import (IMPORTANT_WEIGHT_THRESHOLD, ArchivedTask,
+                     PendingUserPurge, PriorityRule, Task, UserShard)
+from .priority_rules import current_rules
+from .purge import cancel_user_purge, schedule_user_purge
+from .sharding import global_status_counts, shard_for_user, user_rows
+from .sync import record_queryset_changes
+
+
+def estimate_row_count(model, using):
+    table = model._meta.db_table
+    connection = connections[using]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [table]
+                )
+            elif connection.vendor == 'sqlite':
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                    [table]
+                )
+            else:
+                return None
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if not row or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        # Менеджер по умолчанию сам скрывает удалённые задачи, поэтому
+        # «без фильтров» — это условие менеджера, а не пустой WHERE.
+        unfiltered = queryset.model._default_manager.all().query.where
+        if queryset.query.where == unfiltered:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if (estimate is not None
+                    and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD):
+                return estimate
+        return super().count
+
+
+class UserAutocompleteFilter(admin.SimpleListFilter):
+    title = _('пользователю')
+    parameter_name = 'user'
+    template = 'admin/tasks/user_autocomplete_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    @cached_property
+    def selected_user(self):
+        if not self.value() or not self.value().isdigit():
+            return None
+        return User.objects.filter(pk=self.value()).first()
+
+    def queryset(self, request, queryset):
+        if self.value() and self.value().isdigit():
+            return queryset.filter(user_id=self.value())
+        return queryset
+
+
+def selected_shard(request):
+    alias = request.GET.get(ShardFilter.parameter_name)
+    if alias in settings.TASK_SHARDS:
+        return alias
+    user_id = request.GET.get(UserAutocompleteFilter.parameter_name, '')
+    if user_id.isdigit():
+        return shard_for_user(int(user_id))
+    return settings.TASK_SHARDS[0]
+
+
+class ShardFilter(admin.SimpleListFilter):
+    # Список задач всегда строится по одной базе: без явного выбора —
+    # по базе выбранного пользователя или по первому шарду.
+    title = _('базе данных')
+    parameter_name = 'shard'
+
+    def __init__(self, request, params, model, model_admin):
+        self.shard = selected_shard(request)
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in settings.TASK_SHARDS]
+
+    def has_output(self):
+        return len(settings.TASK_SHARDS) > 1
+
+    def choices(self, changelist):
+        for alias, title in self.lookup_choices:
+            yield {
+                'selected': self.shard == alias,
+                'query_string': changelist.get_query_string(
+                    {self.parameter_name: alias}
+                ),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        return queryset.using(self.shard)
+
+
+class ShardChangeList(ChangeList):
+    # Пользователи хранятся в default, поэтому JOIN с шардом невозможен:
+    # они подгружаются для страницы отдельным запросом.
+    def get_results(self, request):
+        super().get_results(request)
+        self.result_list = list(self.result_list)
+        prefetch_related_objects(self.result_list, 'user')
 
 
 class TaskAdminForm(forms.ModelForm):
@@ -34,15 +165,24 @@ class TaskAdmin(admin.ModelAdmin):
     list_filter = (
         'status',
         'priority',
-        'user',
-        'created_at',
-        'updated_at'
+        UserAutocompleteFilter,
+        ShardFilter,
     )
 
+    list_select_related = ()
+    autocomplete_fields = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     search_fields = ('title', 'description')
     date_hierarchy = 'due_date'
     ordering = ('-due_date',)
     readonly_fields = ('created_at', 'updated_at')
+    actions = (
+        'mark_todo',
+        'mark_in_progress',
+        'mark_done',
+        'recompute_priority',
+    )
 
     fieldsets = (
         (None, {
@@ -60,24 +200,246 @@ class TaskAdmin(admin.ModelAdmin):
         }),
     )
 
-    def get_form(self, request, obj=None, **kwargs):
-        form = super().get_form(request, obj, **kwargs)
-        if 'user' in form.base_fields:
-            form.base_fields['user'].queryset = User.objects.all().order_by(
-                'username'
+    def get_object(self, request, object_id, from_field=None):
+        for alias in settings.TASK_SHARDS:
+            queryset = self.get_queryset(request).using(alias)
+            field = (
+                self.model._meta.get_field(from_field)
+                if from_field else self.model._meta.pk
+            )
+            try:
+                return queryset.get(**{field.name: field.to_python(object_id)})
+            except (self.model.DoesNotExist, ValidationError, ValueError):
+                continue
+        return None
+
+    def get_changelist(self, request, **kwargs):
+        return ShardChangeList
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        if len(settings.TASK_SHARDS) > 1:
+            extra_context['shard_stats'] = global_status_counts()
+            extra_context['selected_shard'] = selected_shard(request)
+        return super().changelist_view(request, extra_context)
+
+    def change_status(self, request, queryset, status):
+        with transaction.atomic(using=queryset.db):
+            now = timezone.now()
+            record_queryset_changes(queryset)
+            record_queryset_transitions(queryset, status, now)
+            invalidate_boards(
+                queryset.values_list('user_id', flat=True).distinct(),
+                queryset.db
             )
-        return form
+            updated = queryset.update(
+                status=status,
+                original_status=None,
+                updated_at=now
+            )
+        self.message_user(
+            request,
+            f'Статус «{dict(Task.STATUS_CHOICES)[status]}» установлен '
+            f'для задач: {updated}',
+            messages.SUCCESS
+        )
+
+    @admin.action(description=_('Перевести в «К выполнению»'))
+    def mark_todo(self, request, queryset):
+        self.change_status(request, queryset, 'todo')
+
+    @admin.action(description=_('Перевести в «В работе»'))
+    def mark_in_progress(self, request, queryset):
+        self.change_status(request, queryset, 'in_progress')
+
+    @admin.action(description=_('Перевести в «Выполнено»'))
+    def mark_done(self, request, queryset):
+        self.change_status(request, queryset, 'done')
+
+    @admin.action(description=_('Пересчитать приоритет'))
+    def recompute_priority(self, request, queryset):
+        now = timezone.now()
+        rules = current_rules()
+        important_titles = defaultdict(list)
+        for user_id, title in queryset.values_list(
+                'user_id', 'title').distinct().iterator():
+            weight = rules.weight(Task.title_lemmas(title), user_id)
+            if weight >= IMPORTANT_WEIGHT_THRESHOLD:
+                important_titles[user_id].append(title)
+        with transaction.atomic(using=queryset.db):
+            record_queryset_changes(queryset)
+            invalidate_boards(
+                queryset.values_list('user_id', flat=True).distinct(),
+                queryset.db
+            )
+            updated = queryset.update(
+                updated_at=now,
+                **Task.priority_update(is_important=False, now=now)
+            )
+            batch_size = settings.ADMIN_BULK_ACTION_BATCH_SIZE
+            for user_id, titles in important_titles.items():
+                for start in range(0, len(titles), batch_size):
+                    queryset.filter(
+                        user_id=user_id,
+                        title__in=titles[start:start + batch_size]
+                    ).update(
+                        **Task.priority_update(is_important=True, now=now)
+                    )
+        self.message_user(
+            request,
+            f'Приоритет пересчитан для задач: {updated}',
+            messages.SUCCESS
+        )
 
 
 admin.site.register(Task, TaskAdmin)
 
 
+class PriorityRuleAdmin(admin.ModelAdmin):
+    list_display = (
+        'phrase',
+        'lemmas',
+        'weight',
+        'is_ignored',
+        'user',
+        'updated_at'
+    )
+    list_editable = ('weight', 'is_ignored')
+    list_filter = ('is_ignored', ('user', admin.EmptyFieldListFilter))
+    list_select_related = ('user',)
+    search_fields = ('phrase', 'lemmas')
+    autocomplete_fields = ('user',)
+    readonly_fields = ('lemmas', 'updated_at')
+    ordering = ('user', '-weight', 'phrase')
+
+
+admin.site.register(PriorityRule, PriorityRuleAdmin)
+
+
+class ArchivedTaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'title',
+        'user',
+        'due_date',
+        'status',
+        'priority',
+        'archived_at'
+    )
+    list_filter = ('priority',)
+    search_fields = ('title', 'description')
+    ordering = ('-archived_at',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+admin.site.register(ArchivedTask, ArchivedTaskAdmin)
+
+
+class UserShardAdmin(admin.ModelAdmin):
+    list_display = ('user', 'alias', 'moved_at')
+    list_filter = ('alias',)
+    search_fields = ('user__username',)
+    readonly_fields = ('user', 'alias', 'moved_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+admin.site.register(UserShard, UserShardAdmin)
+
+
+class PendingUserPurgeAdmin(admin.ModelAdmin):
+    list_display = (
+        'user',
+        'requested_by',
+        'requested_at',
+        'purge_after',
+        'started_at'
+    )
+    list_select_related = ('user', 'requested_by')
+    readonly_fields = (
+        'user',
+        'requested_by',
+        'was_active',
+        'requested_at',
+        'purge_after',
+        'started_at'
+    )
+    actions = ('cancel_purge',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description=_('Отменить удаление пользователей'))
+    def cancel_purge(self, request, queryset):
+        cancelled = sum(
+            cancel_user_purge(purge)
+            for purge in queryset.select_related('user')
+        )
+        self.message_user(
+            request,
+            f'Удаление отменено для пользователей: {cancelled}',
+            messages.SUCCESS
+        )
+
+
+admin.site.register(PendingUserPurge, PendingUserPurgeAdmin)
+
+
 class UserAdmin(BaseUserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff')
     search_fields = ('username', 'email', 'first_name', 'last_name')
     ordering = ('username',)
     filter_horizontal = ()
 
+    def get_deleted_objects(self, objs, request):
+        deleted_objects = [
+            f'{user}: будет отключён и удалён вместе с задачами через '
+            f'{settings.USER_DELETE_GRACE_SECONDS // 3600} ч'
+            for user in objs
+        ]
+        return deleted_objects, {}, self.purge_perms_needed(objs, request), []
+
+    def purge_perms_needed(self, objs, request):
+        # Задачи удаляются вместе с пользователем, поэтому, как и в обычном
+        # подтверждении удаления, нужны права на удаление связанных строк.
+        perms_needed = set()
+        for relation in User._meta.related_objects:
+            model = relation.related_model
+            opts = model._meta
+            if (not self.admin_site.is_registered(model)
+                    or relation.on_delete is not models.CASCADE
+                    or request.user.has_perm(
+                        f'{opts.app_label}.'
+                        f'{get_permission_codename("delete", opts)}'
+                    )):
+                continue
+            for user in objs:
+                if getattr(model, 'shard_user_field', None):
+                    rows = user_rows(model, user.pk, shard_for_user(user.pk))
+                else:
+                    rows = model._base_manager.filter(
+                        **{relation.field.name: user}
+                    )
+                if rows.exists():
+                    perms_needed.add(opts.verbose_name)
+                    break
+        return perms_needed
+
+    def delete_model(self, request, obj):
+        schedule_user_purge(obj, requested_by=request.user)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            schedule_user_purge(user, requested_by=request.user)
+
 
 admin.site.unregister(User)
 admin.site.register(User, UserAdmin)
@@ -0,0 +1,89 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, models, transaction
+from django.utils import timezone
+
+from .board import tasks_removed
+from .duplicates import unindex_tasks
+from .models import ArchivedTask, Task
+from .sync import record_changes
+
+TASK_COLUMNS = [
+    field.column for field in Task._meta.concrete_fields
+]
+
+
+def archive_candidates(older_than, alias):
+    return Task.objects.using(alias).filter(
+        status='done',
+        updated_at__lt=older_than
+    ).order_by('pk')
+
+
+def archive_batch(older_than, batch_size, alias):
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(column) for column in TASK_COLUMNS)
+    with transaction.atomic(using=alias):
+        rows = list(
+            archive_candidates(older_than, alias)
+            .select_for_update()
+            .values_list('pk', 'user_id')[:batch_size]
+        )
+        if not rows:
+            return 0
+        pks = [pk for pk, user_id in rows]
+        placeholders = ', '.join(['%s'] * len(pks))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {quote(ArchivedTask._meta.db_table)} '
+                f'({columns}, {quote("archived_at")}) '
+                f'SELECT {columns}, %s '
+                f'FROM {quote(Task._meta.db_table)} '
+                f'WHERE {quote("id")} IN ({placeholders})',
+                [
+                    connection.ops.adapt_datetimefield_value(timezone.now()),
+                    *pks
+                ]
+            )
+            cursor.execute(
+                f'DELETE FROM {quote(Task._meta.db_table)} '
+                f'WHERE {quote("id")} IN ({placeholders})',
+                pks
+            )
+        unindex_tasks(pks, alias)
+        archived = defaultdict(list)
+        for pk, user_id in rows:
+            archived[user_id].append(pk)
+        for user_id, user_pks in archived.items():
+            record_changes(user_id, user_pks, 'delete', using=alias)
+            tasks_removed(user_id, user_pks, alias)
+    return len(pks)
+
+
+def archive_done_tasks(days, batch_size, on_batch=None):
+    older_than = timezone.now() - timezone.timedelta(days=days)
+    total = 0
+    for alias in settings.TASK_SHARDS:
+        while True:
+            archived = archive_batch(older_than, batch_size, alias)
+            if not archived:
+                break
+            total += archived
+            if on_batch:
+                on_batch(total)
+    return total
+
+
+def tasks_with_archive(user, condition=None):
+    condition = condition or models.Q()
+    hot = Task.objects.for_user(user).filter(condition).annotate(
+        is_archived=models.Value(False, output_field=models.BooleanField())
+    )
+    archived = ArchivedTask.objects.for_user(user).filter(condition).defer(
+        'archived_at'
+    ).annotate(
+        is_archived=models.Value(True, output_field=models.BooleanField())
+    )
+    return hot.union(archived, all=True)
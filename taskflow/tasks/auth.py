@@ -0,0 +1,51 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import router
+
+_users = {}
+_lock = threading.Lock()
+
+
+def invalidate_cached_user(user_id=None):
+    with _lock:
+        if user_id is None:
+            _users.clear()
+        else:
+            _users.pop(user_id, None)
+
+
+def cached_user_fields(user_id):
+    with _lock:
+        entry = _users.get(user_id)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+    fields = User._default_manager.filter(pk=user_id).values(
+        *[field.attname for field in User._meta.concrete_fields]
+    ).first()
+    if fields is not None:
+        expires = time.monotonic() + settings.AUTH_USER_CACHE_SECONDS
+        with _lock:
+            if len(_users) >= settings.AUTH_USER_CACHE_SIZE:
+                _users.clear()
+            _users[user_id] = (expires, fields)
+    return fields
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        try:
+            user_id = User._meta.pk.to_python(user_id)
+        except ValidationError:
+            return None
+        fields = cached_user_fields(user_id)
+        if fields is None:
+            return None
+        user = User(**fields)
+        user._state.adding = False
+        user._state.db = router.db_for_read(User)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,209 @@
+import bisect
+import sys
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+from .calendar import feed_version
+from .models import Task
+
+BOARD_FIELDS = (
+    'pk', 'title', 'description', 'due_date', 'status', 'original_status',
+    'priority', 'priority_rank', 'updated_at'
+)
+PK, DUE_DATE, STATUS, ORIGINAL_STATUS, PRIORITY_RANK, UPDATED_AT = (
+    BOARD_FIELDS.index(field)
+    for field in ('pk', 'due_date', 'status', 'original_status',
+                  'priority_rank', 'updated_at')
+)
+OVERDUE_FROM = ('todo', 'in_progress')
+
+_boards = OrderedDict()
+_lock = threading.Lock()
+
+
+def sort_key(card):
+    return card[DUE_DATE], -card[PRIORITY_RANK], card[PK]
+
+
+def task_card(task):
+    return tuple(getattr(task, field) for field in BOARD_FIELDS)
+
+
+class BoardSnapshot:
+    def __init__(self, cards):
+        self.cards = {}
+        self.columns = {status: [] for status, label in Task.STATUS_CHOICES}
+        for card in cards:
+            self.cards[card[PK]] = card
+            self.columns[card[STATUS]].append(sort_key(card))
+        for column in self.columns.values():
+            column.sort()
+
+    def remove(self, pk):
+        card = self.cards.pop(pk, None)
+        if card is not None:
+            column = self.columns[card[STATUS]]
+            del column[bisect.bisect_left(column, sort_key(card))]
+
+    def upsert(self, card):
+        self.remove(card[PK])
+        self.cards[card[PK]] = card
+        bisect.insort(self.columns[card[STATUS]], sort_key(card))
+
+    def mark_overdue(self, pks, now):
+        for pk in pks:
+            card = self.cards.get(pk)
+            if card is not None and card[STATUS] in OVERDUE_FROM:
+                card = list(card)
+                card[ORIGINAL_STATUS] = card[STATUS]
+                card[STATUS] = 'overdue'
+                card[UPDATED_AT] = now
+                self.upsert(tuple(card))
+
+    def fingerprint(self):
+        return {
+            'last_modified': max(
+                (card[UPDATED_AT] for card in self.cards.values()),
+                default=None
+            ),
+            'count': len(self.cards),
+        }
+
+    def overdue_candidates(self, now):
+        candidates = []
+        for status in OVERDUE_FROM:
+            for due_date, rank, pk in self.columns[status]:
+                if due_date >= now:
+                    break
+                if self.cards[pk][ORIGINAL_STATUS] is None:
+                    candidates.append(pk)
+        return candidates
+
+    def tasks(self, status):
+        return [
+            Task(**dict(zip(BOARD_FIELDS, self.cards[pk])))
+            for due_date, rank, pk in self.columns[status]
+        ]
+
+    def memory_bytes(self):
+        size = sys.getsizeof(self.cards) + sys.getsizeof(self.columns)
+        for card in self.cards.values():
+            size += sys.getsizeof(card) + sum(map(sys.getsizeof, card))
+        for column in self.columns.values():
+            size += sys.getsizeof(column) + sum(map(sys.getsizeof, column))
+        return size
+
+
+def load_board(user_id):
+    cards = Task.objects.for_user(user_id).values_list(*BOARD_FIELDS)
+    return BoardSnapshot(cards.iterator())
+
+
+def get_board(user):
+    # Снимок сверяется с базой по числу задач и последнему updated_at,
+    # поэтому изменения из других процессов и команд не остаются
+    # незамеченными: такой снимок просто строится заново.
+    user_id = getattr(user, 'pk', user)
+    version = feed_version(user_id)
+    with _lock:
+        snapshot = _boards.get(user_id)
+        if snapshot is not None and snapshot.fingerprint() == version:
+            _boards.move_to_end(user_id)
+            return snapshot
+    snapshot = load_board(user_id)
+    if len(snapshot.cards) <= settings.BOARD_SNAPSHOT_MAX_TASKS:
+        with _lock:
+            _boards[user_id] = snapshot
+            _boards.move_to_end(user_id)
+            while len(_boards) > settings.BOARD_SNAPSHOT_MAX_USERS:
+                _boards.popitem(last=False)
+    return snapshot
+
+
+def board_columns(snapshot):
+    with _lock:
+        return {
+            status: snapshot.tasks(status)
+            for status, label in Task.STATUS_CHOICES
+        }
+
+
+def overdue_candidates(snapshot, now):
+    with _lock:
+        return snapshot.overdue_candidates(now)
+
+
+def patch_board(user_id, using, patch=None):
+    def apply():
+        with _lock:
+            snapshot = _boards.get(user_id)
+            if snapshot is None:
+                return
+            if patch is None:
+                del _boards[user_id]
+                return
+            patch(snapshot)
+            if len(snapshot.cards) > settings.BOARD_SNAPSHOT_MAX_TASKS:
+                del _boards[user_id]
+
+    transaction.on_commit(apply, using=using)
+
+
+def task_saved(task, using):
+    if task.deleted_at is not None:
+        tasks_removed(task.user_id, [task.pk], using)
+    elif task.get_deferred_fields() & set(BOARD_FIELDS):
+        patch_board(task.user_id, using)
+    else:
+        card = task_card(task)
+        patch_board(task.user_id, using, lambda board: board.upsert(card))
+
+
+def tasks_removed(user_id, pks, using):
+    def remove(board):
+        for pk in pks:
+            board.remove(pk)
+
+    patch_board(user_id, using, remove)
+
+
+def tasks_marked_overdue(user_id, pks, now, using):
+    patch_board(user_id, using, lambda board: board.mark_overdue(pks, now))
+
+
+def invalidate_boards(user_ids, using=None):
+    for user_id in set(user_ids):
+        patch_board(user_id, using)
+
+
+def board_differences(user):
+    user_id = getattr(user, 'pk', user)
+    with _lock:
+        snapshot = _boards.get(user_id)
+    if snapshot is None:
+        return []
+    fresh = load_board(user_id)
+    differences = []
+    with _lock:
+        for pk in fresh.cards.keys() - snapshot.cards.keys():
+            differences.append(f'#{pk}: нет в снимке')
+        for pk in snapshot.cards.keys() - fresh.cards.keys():
+            differences.append(f'#{pk}: удалена, но осталась в снимке')
+        for pk in fresh.cards.keys() & snapshot.cards.keys():
+            if fresh.cards[pk] != snapshot.cards[pk]:
+                differences.append(f'#{pk}: поля карточки отличаются')
+        for status, column in fresh.columns.items():
+            if column != snapshot.columns[status]:
+                differences.append(f'{status}: порядок карточек отличается')
+    return differences
+
+
+def board_stats():
+    with _lock:
+        return [
+            (user_id, len(snapshot.cards), snapshot.memory_bytes())
+            for user_id, snapshot in _boards.items()
+        ]
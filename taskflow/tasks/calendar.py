@@ -0,0 +1,114 @@
+import datetime
+
+from django.core import signing
+from django.db import models
+from django.utils.crypto import constant_time_compare, get_random_string
+
+from .models import CalendarFeed, Task
+
+FEED_SALT = 'tasks.calendar-feed'
+
+
+def feed_token(user):
+    feed, created = CalendarFeed.objects.get_or_create(
+        user=user,
+        defaults={'secret': get_random_string(32)}
+    )
+    return signing.Signer(salt=FEED_SALT).sign(f'{user.pk}.{feed.secret}')
+
+
+def reset_feed_token(user):
+    CalendarFeed.objects.update_or_create(
+        user=user,
+        defaults={'secret': get_random_string(32)}
+    )
+
+
+def user_id_from_token(token):
+    # Секрет хранится в базе: после сброса ссылки или отключения
+    # пользователя старые подписанные ссылки перестают работать.
+    try:
+        user_id, secret = signing.Signer(salt=FEED_SALT).unsign(
+            token
+        ).split('.')
+        user_id = int(user_id)
+    except (signing.BadSignature, ValueError):
+        return None
+    feed = CalendarFeed.objects.filter(
+        user_id=user_id,
+        user__is_active=True
+    ).values_list('secret', flat=True).first()
+    if feed is None or not constant_time_compare(feed, secret):
+        return None
+    return user_id
+
+
+def feed_version(user_id):
+    return Task.objects.for_user(user_id).aggregate(
+        last_modified=models.Max('updated_at'),
+        count=models.Count('id')
+    )
+
+
+def escape_text(value):
+    return (
+        value.replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold_line(line):
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    current = ''
+    limit = 75
+    for char in line:
+        if len((current + char).encode('utf-8')) > limit:
+            parts.append(current)
+            current = ''
+            limit = 74
+        current += char
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_datetime(value):
+    return value.astimezone(datetime.timezone.utc).strftime(
+        '%Y%m%dT%H%M%SZ'
+    )
+
+
+def task_event(task):
+    statuses = dict(Task.STATUS_CHOICES)
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:task-{task.pk}@taskflow',
+        f'DTSTAMP:{format_datetime(task.updated_at)}',
+        f'LAST-MODIFIED:{format_datetime(task.updated_at)}',
+        f'DTSTART:{format_datetime(task.due_date)}',
+        'DURATION:PT30M',
+        f'SUMMARY:{escape_text(task.title)}',
+        f'CATEGORIES:{escape_text(statuses.get(task.status, task.status))}',
+    ]
+    if task.status == 'done':
+        lines.append('TRANSP:TRANSPARENT')
+    lines.append('END:VEVENT')
+    return ''.join(fold_line(line) for line in lines)
+
+
+def calendar_stream(user_id, chunk_size=500):
+    yield fold_line('BEGIN:VCALENDAR')
+    yield fold_line('VERSION:2.0')
+    yield fold_line('PRODID:-//TaskFlow//Tasks//RU')
+    yield fold_line('X-WR-CALNAME:TaskFlow')
+    tasks = Task.objects.for_user(user_id).only(
+        'title', 'status', 'due_date', 'updated_at'
+    ).order_by('pk')
+    for task in tasks.iterator(chunk_size=chunk_size):
+        yield task_event(task)
+    yield fold_line('END:VCALENDAR')
@@ -0,0 +1,156 @@
+import functools
+import hashlib
+import random
+
+from django.conf import settings
+from django.db import models, transaction
+
+from .models import Task, TaskLshBucket
+from .sharding import delete_by_pk
+
+MERSENNE_PRIME = (1 << 61) - 1
+
+
+def make_permutations(count, seed=1):
+    rng = random.Random(seed)
+    return [
+        (rng.randrange(1, MERSENNE_PRIME), rng.randrange(MERSENNE_PRIME))
+        for _ in range(count)
+    ]
+
+
+PERMUTATIONS = make_permutations(settings.DUPLICATE_MINHASH_PERMUTATIONS)
+
+
+@functools.lru_cache(maxsize=100000)
+def cached_lemmas(title):
+    return tuple(Task.title_lemmas(title))
+
+
+def shingles(lemmas):
+    return set(lemmas) | {
+        f'{first} {second}' for first, second in zip(lemmas, lemmas[1:])
+    }
+
+
+def shingle_hash(shingle):
+    return int.from_bytes(
+        hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big'
+    )
+
+
+def minhash(shingle_set):
+    hashes = [shingle_hash(shingle) for shingle in shingle_set]
+    return [
+        min((a * value + b) % MERSENNE_PRIME for value in hashes)
+        for a, b in PERMUTATIONS
+    ]
+
+
+def lsh_buckets(lemmas):
+    shingle_set = shingles(lemmas)
+    if not shingle_set:
+        return []
+    signature = minhash(shingle_set)
+    bands = settings.DUPLICATE_LSH_BANDS
+    rows = len(signature) // bands
+    return [
+        int.from_bytes(
+            hashlib.blake2b(
+                repr((band, signature[band * rows:(band + 1) * rows])).encode(),
+                digest_size=8
+            ).digest(),
+            'big',
+            signed=True
+        )
+        for band in range(bands)
+    ]
+
+
+def jaccard(first, second):
+    union = first | second
+    return len(first & second) / len(union) if union else 0
+
+
+def index_task(task, using):
+    buckets = TaskLshBucket.objects.using(using)
+    with transaction.atomic(using=using):
+        buckets.filter(task_id=task.pk).delete()
+        buckets.bulk_create([
+            TaskLshBucket(user_id=task.user_id, task_id=task.pk, bucket=bucket)
+            for bucket in set(lsh_buckets(task.lemmas()))
+        ])
+
+
+def unindex_tasks(pks, using):
+    return TaskLshBucket.objects.using(using).filter(task_id__in=pks).delete()[0]
+
+
+def find_duplicates(user, title, exclude=None):
+    lemmas = cached_lemmas(title)
+    buckets = lsh_buckets(lemmas)
+    if not buckets:
+        return []
+    candidates = TaskLshBucket.objects.for_user(user).filter(
+        bucket__in=buckets
+    ).values('task_id').annotate(
+        hits=models.Count('pk')
+    ).order_by('-hits').values_list('task_id', flat=True)[
+        :settings.DUPLICATE_MAX_CANDIDATES
+    ]
+    tasks = Task.objects.for_user(user).filter(pk__in=list(candidates))
+    if exclude is not None:
+        tasks = tasks.exclude(pk=exclude)
+
+    target = shingles(lemmas)
+    duplicates = []
+    for task in tasks:
+        task.similarity = jaccard(target, shingles(cached_lemmas(task.title)))
+        if task.similarity >= settings.DUPLICATE_SIMILARITY_THRESHOLD:
+            duplicates.append(task)
+    duplicates.sort(key=lambda task: task.similarity, reverse=True)
+    return duplicates[:settings.DUPLICATE_MAX_RESULTS]
+
+
+def merge_into(task, description, due_date):
+    if description and description not in (task.description or ''):
+        task.description = '\n'.join(
+            part for part in (task.description, description) if part
+        )
+    if due_date and due_date < task.due_date:
+        task.due_date = due_date
+    task.save()
+    return task
+
+
+def rebuild_index(alias, user_id=None, batch_size=None, on_batch=None):
+    batch_size = batch_size or settings.DUPLICATE_INDEX_BATCH_SIZE
+    tasks = Task.objects.using(alias).order_by('pk')
+    buckets = TaskLshBucket.objects.using(alias)
+    if user_id is not None:
+        tasks = tasks.filter(user_id=user_id)
+        buckets = buckets.filter(user_id=user_id)
+    while True:
+        pks = list(buckets.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        delete_by_pk(TaskLshBucket, alias, pks)
+
+    indexed = 0
+    rows = tasks.values_list('pk', 'user_id', 'title')
+    batch = []
+    for pk, task_user_id, title in rows.iterator(chunk_size=batch_size):
+        batch.extend(
+            TaskLshBucket(user_id=task_user_id, task_id=pk, bucket=bucket)
+            for bucket in set(lsh_buckets(cached_lemmas(title)))
+        )
+        indexed += 1
+        if indexed % batch_size == 0:
+            TaskLshBucket.objects.using(alias).bulk_create(batch)
+            batch = []
+            if on_batch:
+                on_batch(indexed)
+    TaskLshBucket.objects.using(alias).bulk_create(
+        batch, batch_size=batch_size
+    )
+    return indexed
@@ -0,0 +1,190 @@
+import gzip
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .archive import tasks_with_archive
+from .models import ExportJob, Task
+
+STATUS_LABELS = {
+    'overdue': 'Просроченные',
+    'todo': 'К выполнению',
+    'in_progress': 'В работе',
+    'done': 'Выполненные',
+    None: 'Все задачи'
+}
+
+SORT_MAPPING = {
+    'id': 'id',
+    '-id': '-id',
+    'title': 'title',
+    '-title': '-title',
+    'status': 'status',
+    '-status': '-status',
+    'priority': 'priority_rank',
+    '-priority': '-priority_rank',
+    'due_date': 'due_date',
+    '-due_date': '-due_date',
+}
+
+
+def export_queryset(user, status, sort_by, now=None, after=None):
+    condition = models.Q()
+    if status == 'overdue':
+        condition = (
+            models.Q(status='overdue') |
+            models.Q(
+                due_date__lt=now or timezone.now(),
+                status__in=['todo', 'in_progress']
+            )
+        )
+    elif status:
+        condition = models.Q(status=status)
+    order_field = SORT_MAPPING.get(sort_by, 'id')
+    if after is not None:
+        condition &= keyset_condition(order_field, *after)
+    return tasks_with_archive(user, condition).order_by(order_field, 'id')
+
+
+def keyset_condition(order_field, value, pk):
+    field = order_field.lstrip('-')
+    if field == 'id':
+        return models.Q(id__lt=pk) if order_field == '-id' else (
+            models.Q(id__gt=pk)
+        )
+    lookup = 'lt' if order_field.startswith('-') else 'gt'
+    return (
+        models.Q(**{f'{field}__{lookup}': value}) |
+        models.Q(**{field: value, 'id__gt': pk})
+    )
+
+
+def sort_value(task, sort_by):
+    return getattr(task, SORT_MAPPING.get(sort_by, 'id').lstrip('-'))
+
+
+def export_header(status):
+    label = STATUS_LABELS.get(status, 'Все задачи')
+    return f"Экспорт задач (статус: {label})\n" + "=" * 50 + "\n\n"
+
+
+def export_task(task, username):
+    lines = [
+        f"Задача: {task.title}\n",
+        f"Описание: {task.description}\n",
+        f"Срок: {task.due_date}\n",
+        f"Приоритет: {task.get_priority_display()}\n",
+        f"Статус: {task.get_status_display()}\n",
+    ]
+    if task.is_archived:
+        lines.append("В архиве: да\n")
+    lines.append(f"Пользователь: {username}\n")
+    lines.append("-" * 50 + "\n")
+    return ''.join(lines)
+
+
+def export_filename(status):
+    return f"export_tasks_{status or 'all'}.txt"
+
+
+def claim_next_job():
+    now = timezone.now()
+    stale_before = now - timezone.timedelta(
+        seconds=settings.EXPORT_JOB_STALE_SECONDS
+    )
+    candidates = ExportJob.objects.filter(
+        models.Q(state='pending') |
+        models.Q(state='running', updated_at__lt=stale_before)
+    ).order_by('created_at')
+
+    for job in candidates[:50]:
+        running = ExportJob.objects.filter(
+            user_id=job.user_id,
+            state='running',
+            updated_at__gte=stale_before
+        ).values('user_id').annotate(count=models.Count('pk')).values('count')
+        # Лимит проверяется в том же UPDATE, что и захват задачи: SQLite
+        # выполняет его под блокировкой записи, а на остальных базах
+        # активные экспорты пользователя сначала блокируются.
+        with transaction.atomic():
+            if connection.features.has_select_for_update:
+                list(ExportJob.objects.select_for_update().filter(
+                    user_id=job.user_id,
+                    state__in=['pending', 'running']
+                ).order_by('pk').values_list('pk', flat=True))
+            claimed = ExportJob.objects.alias(
+                running=Coalesce(models.Subquery(running), 0)
+            ).filter(
+                pk=job.pk,
+                state=job.state,
+                updated_at=job.updated_at,
+                running__lt=settings.EXPORT_JOB_USER_CONCURRENCY
+            ).update(state='running', updated_at=now)
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def write_chunk(job, text):
+    with open(job.file_path, 'ab') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as archive:
+            archive.write(text.encode('utf-8'))
+        return raw.tell()
+
+
+def run_export_job(job, chunk_size):
+    settings.EXPORT_ROOT.mkdir(parents=True, exist_ok=True)
+    if job.file_path.exists():
+        with open(job.file_path, 'r+b') as raw:
+            raw.truncate(job.bytes_written)
+    if job.rows_written == 0 and job.bytes_written == 0:
+        job.bytes_written = write_chunk(
+            job, export_header(job.status_filter or None)
+        )
+        job.save(update_fields=['bytes_written', 'updated_at'])
+
+    # Продолжение идёт от последней выгруженной задачи по ключу сортировки,
+    # а не по смещению: вставки и удаления задач во время экспорта не
+    # приводят к пропускам и повторам строк.
+    after = None
+    if job.last_task_id is not None:
+        field = Task._meta.get_field(
+            SORT_MAPPING.get(job.sort, 'id').lstrip('-')
+        )
+        after = (field.to_python(job.last_sort_value), job.last_task_id)
+    tasks = export_queryset(
+        job.user,
+        job.status_filter or None,
+        job.sort,
+        now=job.created_at,
+        after=after
+    )
+    username = job.user.username
+    buffer = []
+    last_task = None
+    for task in tasks.iterator(chunk_size=chunk_size):
+        buffer.append(export_task(task, username))
+        last_task = task
+        if len(buffer) >= chunk_size:
+            flush_chunk(job, buffer, last_task)
+            buffer = []
+    if buffer:
+        flush_chunk(job, buffer, last_task)
+
+    job.state = 'done'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['state', 'finished_at', 'updated_at'])
+
+
+def flush_chunk(job, buffer, last_task):
+    job.bytes_written = write_chunk(job, ''.join(buffer))
+    job.rows_written += len(buffer)
+    job.last_sort_value = str(sort_value(last_task, job.sort))
+    job.last_task_id = last_task.pk
+    job.save(update_fields=[
+        'rows_written', 'bytes_written', 'last_sort_value', 'last_task_id',
+        'updated_at'
+    ])
@@ -0,0 +1,173 @@
+import bisect
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import models
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Task, TaskTransition
+
+
+class DurationHistogram:
+    def __init__(self, base=60, growth=2 ** 0.25, buckets=96):
+        self.bounds = [base * growth ** index for index in range(buckets)]
+        self.counts = [0] * (buckets + 1)
+        self.total = 0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.total += 1
+
+    def percentile(self, percent):
+        if not self.total:
+            return None
+        rank = math.ceil(self.total * percent / 100)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.bounds[min(index, len(self.bounds) - 1)]
+
+    def summary(self):
+        return {
+            'count': self.total,
+            **{
+                f'p{percent}': self.percentile(percent)
+                for percent in settings.ANALYTICS_PERCENTILES
+            },
+        }
+
+
+def record_transitions(user_id, rows, to_status, changed_at, using):
+    TaskTransition.objects.using(using).bulk_create(
+        [
+            TaskTransition(
+                user_id=user_id,
+                task_id=pk,
+                from_status=from_status,
+                to_status=to_status,
+                changed_at=changed_at
+            )
+            for pk, from_status in rows
+            if from_status != to_status
+        ],
+        batch_size=settings.ANALYTICS_STREAM_CHUNK_SIZE
+    )
+
+
+def record_queryset_transitions(queryset, to_status, changed_at):
+    rows = defaultdict(list)
+    tasks = queryset.order_by().values_list('pk', 'user_id', 'status')
+    for pk, user_id, status in tasks.iterator(
+            chunk_size=settings.ANALYTICS_STREAM_CHUNK_SIZE):
+        rows[user_id].append((pk, status))
+    for user_id, user_rows in rows.items():
+        record_transitions(
+            user_id, user_rows, to_status, changed_at, queryset.db
+        )
+
+
+def daily_deltas(transitions, start):
+    deltas = defaultdict(lambda: defaultdict(int))
+    completed = defaultdict(int)
+    in_range = transitions.filter(changed_at__gte=start).annotate(
+        day=TruncDate('changed_at')
+    )
+    for field, sign in (('to_status', 1), ('from_status', -1)):
+        rows = in_range.values_list('day', field).annotate(
+            count=models.Count('pk')
+        ).order_by()
+        for day, status, count in rows:
+            if status:
+                deltas[day][status] += sign * count
+            if status == 'done' and sign > 0:
+                completed[day] = count
+    return deltas, completed
+
+
+def status_counts_before(transitions, start):
+    counts = defaultdict(int)
+    before = transitions.filter(changed_at__lt=start)
+    for field, sign in (('to_status', 1), ('from_status', -1)):
+        rows = before.values_list(field).annotate(
+            count=models.Count('pk')
+        ).order_by()
+        for status, count in rows:
+            if status:
+                counts[status] += sign * count
+    return counts
+
+
+def cumulative_flow(transitions, start, days):
+    counts = status_counts_before(transitions, start)
+    deltas, completed = daily_deltas(transitions, start)
+    first_day = timezone.localtime(start).date()
+    labels = []
+    series = {status: [] for status, label in Task.STATUS_CHOICES}
+    throughput = []
+    for offset in range(days + 1):
+        day = first_day + timezone.timedelta(days=offset)
+        labels.append(day.isoformat())
+        for status, delta in deltas.get(day, {}).items():
+            counts[status] += delta
+        for status in series:
+            series[status].append(counts[status])
+        throughput.append(completed.get(day, 0))
+    return labels, series, throughput
+
+
+def duration_histograms(transitions, start):
+    in_status = {
+        status: DurationHistogram() for status, label in Task.STATUS_CHOICES
+    }
+    cycle_time = DurationHistogram()
+    lead_time = DurationHistogram()
+
+    active = transitions.filter(changed_at__gte=start).values('task_id')
+    rows = transitions.filter(task_id__in=active).order_by(
+        'task_id', 'changed_at', 'pk'
+    ).values_list('task_id', 'from_status', 'to_status', 'changed_at')
+
+    current = created_at = started_at = entered_at = None
+    for task_id, from_status, to_status, changed_at in rows.iterator(
+            chunk_size=settings.ANALYTICS_STREAM_CHUNK_SIZE):
+        if task_id != current:
+            current = task_id
+            created_at = started_at = entered_at = None
+        if from_status is None:
+            created_at = changed_at
+        elif entered_at is not None and changed_at >= start:
+            in_status[from_status].add(
+                (changed_at - entered_at).total_seconds()
+            )
+        if to_status == 'in_progress' and started_at is None:
+            started_at = changed_at
+        if to_status == 'done' and changed_at >= start:
+            if created_at is not None:
+                lead_time.add((changed_at - created_at).total_seconds())
+            if started_at is not None:
+                cycle_time.add((changed_at - started_at).total_seconds())
+        entered_at = changed_at
+    return in_status, cycle_time, lead_time
+
+
+def flow_metrics(user, days):
+    transitions = TaskTransition.objects.for_user(user)
+    start = timezone.localtime().replace(
+        hour=0, minute=0, second=0, microsecond=0
+    ) - timezone.timedelta(days=days)
+    labels, series, throughput = cumulative_flow(transitions, start, days)
+    in_status, cycle_time, lead_time = duration_histograms(transitions, start)
+    return {
+        'days': labels,
+        'cfd': series,
+        'throughput': throughput,
+        'time_in_status': {
+            status: histogram.summary()
+            for status, histogram in in_status.items()
+        },
+        'cycle_time': cycle_time.summary(),
+        'lead_time': lead_time.summary(),
+    }
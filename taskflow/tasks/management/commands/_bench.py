@@ -0,0 +1,78 @@
+import math
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.test.utils import setup_databases, teardown_databases
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.sharding import shard_for_user
+
+TITLE_WORDS = [
+    'отчёт', 'сбой', 'ошибка', 'штраф', 'клиент', 'договор', 'счёт', 'налог',
+    'бюджет', 'аудит', 'квартал', 'годовой', 'подготовить', 'согласовать',
+    'подписать', 'отправить', 'исправить', 'встреча', 'совещание', 'звонок',
+    'письмо', 'проект', 'релиз', 'дедлайн', 'крайний', 'срок', 'сегодня',
+    'завтра', 'врач', 'анализ', 'мама', 'дом', 'ремонт', 'интернет',
+    'срочно', 'важно', 'почта', 'обед', 'отпуск', 'подарок',
+    'купить', 'молоко', 'позвонить', 'написать', 'прочитать', 'книга',
+]
+
+
+@contextmanager
+def bench_databases():
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+def create_bench_user(username='bench'):
+    return User.objects.create_user(username=username, password='bench')
+
+
+def random_title(rng):
+    return ' '.join(rng.choice(TITLE_WORDS) for _ in range(rng.randint(2, 5)))
+
+
+def seed_tasks(user, count, batch_size=5000, seed=0):
+    rng = random.Random(seed)
+    now = timezone.now()
+    statuses = [status for status, _ in Task.STATUS_CHOICES]
+    created = 0
+    while created < count:
+        batch = []
+        for _ in range(min(batch_size, count - created)):
+            priority = rng.choice(list(Task.PRIORITY_RANKS))
+            batch.append(Task(
+                user=user,
+                title=random_title(rng),
+                description=random_title(rng) if rng.random() < 0.5 else None,
+                due_date=now + timezone.timedelta(
+                    minutes=rng.randint(-60 * 24 * 30, 60 * 24 * 60)
+                ),
+                status=rng.choice(statuses),
+                priority=priority,
+                priority_rank=Task.PRIORITY_RANKS[priority],
+            ))
+        Task.objects.using(shard_for_user(user.pk)).bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def timed(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(len(ordered) * percent / 100) - 1, 0)]
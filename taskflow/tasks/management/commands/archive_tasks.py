@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.archive import archive_done_tasks
+from tasks.models import ArchivedTask, Task
+from tasks.sharding import scatter_gather
+
+
+class Command(BaseCommand):
+    help = 'Переносит давно выполненные задачи в архивную таблицу'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.TASK_ARCHIVE_AFTER_DAYS,
+            help='Возраст выполненной задачи (в днях) для архивации'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.TASK_ARCHIVE_BATCH_SIZE,
+            help='Количество задач в одной транзакции'
+        )
+
+    def handle(self, *args, **options):
+        hot_before = self.count(Task)
+        archive_before = self.count(ArchivedTask)
+
+        archived = archive_done_tasks(
+            options['days'],
+            options['batch_size'],
+            on_batch=lambda total: self.stdout.write(
+                f'Перенесено в архив: {total}'
+            )
+        )
+
+        hot_after = self.count(Task)
+        reduction = (
+            (hot_before - hot_after) / hot_before * 100 if hot_before else 0
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Архивировано задач: {archived}\n'
+            f'Рабочая таблица: {hot_before} -> {hot_after} '
+            f'(-{reduction:.1f}%)\n'
+            f'Архив: {archive_before} -> {archive_before + archived}'
+        ))
+
+    def count(self, model):
+        return sum(scatter_gather(
+            lambda alias: model.objects.using(alias).count()
+        ))
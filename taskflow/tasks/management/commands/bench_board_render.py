@@ -0,0 +1,71 @@
+import gzip
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.utils import timezone
+
+from tasks.models import Task
+
+from ._bench import random_title, timed
+
+
+class Command(BaseCommand):
+    help = 'Измеряет размер и время рендеринга доски задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 50000]
+        )
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/')
+        request.user = User(pk=1, username='bench')
+        self.stdout.write(
+            f'{"Карточек":>10} {"HTML, КБ":>10} {"gzip, КБ":>10} '
+            f'{"Байт/карточка":>14} {"Рендер, мс":>11}'
+        )
+        for size in options['sizes']:
+            context = self.board_context(size)
+            html = render_to_string('tasks/dashboard.html', context, request)
+            elapsed = timed(
+                lambda: render_to_string(
+                    'tasks/dashboard.html', context, request
+                ),
+                options['repeat']
+            )
+            payload = html.encode('utf-8')
+            self.stdout.write(
+                f'{size:>10} {len(payload) / 1024:>10.0f} '
+                f'{len(gzip.compress(payload)) / 1024:>10.0f} '
+                f'{len(payload) / size:>14.0f} {elapsed * 1000:>11.0f}'
+            )
+
+    def board_context(self, size):
+        rng = random.Random(size)
+        now = timezone.now()
+        columns = {status: [] for status, _ in Task.STATUS_CHOICES}
+        for pk in range(1, size + 1):
+            status = rng.choice(list(columns))
+            columns[status].append(Task(
+                pk=pk,
+                title=random_title(rng),
+                description=random_title(rng) if rng.random() < 0.5 else None,
+                due_date=now + timezone.timedelta(hours=rng.randint(-500, 500)),
+                status=status,
+                priority=rng.choice(list(Task.PRIORITY_RANKS)),
+            ))
+        return {
+            'overdue_tasks': columns['overdue'],
+            'todo_tasks': columns['todo'],
+            'in_progress_tasks': columns['in_progress'],
+            'done_tasks': columns['done'],
+            'total_tasks': size,
+            'calendar_feed_url': 'http://testserver/calendar/bench.ics',
+        }
@@ -0,0 +1,57 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.duplicates import find_duplicates, rebuild_index
+from tasks.models import Task, TaskLshBucket
+from tasks.sharding import shard_for_user
+
+from ._bench import bench_databases, create_bench_user, random_title, seed_tasks
+
+
+class Command(BaseCommand):
+    help = 'Измеряет время поиска похожих задач по индексу MinHash LSH'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100000)
+        parser.add_argument('--lookups', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with bench_databases():
+            user = create_bench_user()
+            seed_tasks(user, options['tasks'])
+            alias = shard_for_user(user.pk)
+
+            started = time.perf_counter()
+            rebuild_index(alias, user.pk)
+            self.stdout.write(
+                f'Задач: {Task.objects.for_user(user).count()}, '
+                f'корзин: {TaskLshBucket.objects.for_user(user).count()}, '
+                f'построение индекса {time.perf_counter() - started:.1f} с'
+            )
+
+            rng = random.Random(1)
+            titles = list(
+                Task.objects.for_user(user).values_list('title', flat=True)
+                .order_by('?')[:options['lookups'] // 2]
+            )
+            titles += [
+                random_title(rng)
+                for _ in range(options['lookups'] - len(titles))
+            ]
+            timings = []
+            found = 0
+            for title in titles:
+                started = time.perf_counter()
+                found += bool(find_duplicates(user, title))
+                timings.append(time.perf_counter() - started)
+
+        timings.sort()
+        self.stdout.write(
+            f'Поисков: {len(timings)}, с найденными дубликатами: {found}\n'
+            f'p50 {statistics.median(timings) * 1000:.1f} мс, '
+            f'p95 {timings[int(len(timings) * 0.95) - 1] * 1000:.1f} мс, '
+            f'max {timings[-1] * 1000:.1f} мс'
+        )
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from tasks.models import Task
+
+from ._bench import bench_databases, create_bench_user, seed_tasks, timed
+
+ORDERINGS = {
+    'до (лексикографически по priority)': ('due_date', '-priority'),
+    'после (по priority_rank)': ('due_date', '-priority_rank'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает планы и время запросов доски при сортировке '
+        'по priority и priority_rank на тестовой базе'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=200000)
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with bench_databases():
+            users = [
+                create_bench_user(f'bench{index}')
+                for index in range(options['users'])
+            ]
+            per_user = options['tasks'] // len(users)
+            for index, user in enumerate(users):
+                seed_tasks(user, per_user, seed=index)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            user = users[0]
+            self.stdout.write(
+                f'Задач в базе: {Task.objects.count()}, '
+                f'у пользователя: {per_user}\n'
+            )
+            for label, ordering in ORDERINGS.items():
+                queryset = Task.objects.filter(
+                    user=user,
+                    status='todo'
+                ).order_by(*ordering)
+                elapsed = timed(
+                    lambda: list(queryset.values_list('pk', flat=True)),
+                    options['repeat']
+                )
+                self.stdout.write(self.style.MIGRATE_HEADING(label))
+                self.stdout.write(queryset.explain())
+                self.stdout.write(f'Медиана: {elapsed * 1000:.2f} мс\n')
@@ -0,0 +1,65 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from tasks.reminders import TimingWheel
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет скорость планирования напоминаний и расход памяти '
+        'на одно ожидающее напоминание'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000000)
+        parser.add_argument(
+            '--horizon-hours',
+            type=int,
+            default=24 * 7,
+            help='Разброс сроков напоминаний'
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        horizon = options['horizon_hours'] * 3600
+        rng = random.Random(0)
+        start = int(time.time())
+        deadlines = [start + rng.randint(1, horizon) for _ in range(count)]
+
+        tracemalloc.start()
+        wheel = TimingWheel(start)
+        baseline = tracemalloc.get_traced_memory()[0]
+        for key, when in enumerate(deadlines):
+            wheel.schedule(key, when)
+        memory = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        wheel = TimingWheel(start)
+        started = time.perf_counter()
+        for key, when in enumerate(deadlines):
+            wheel.schedule(key, when)
+        schedule_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for key in range(0, count, 10):
+            wheel.schedule(key, deadlines[key] + 60)
+        reschedule_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        fired = 0
+        for now in range(start, start + horizon + 61, 60):
+            fired += len(wheel.advance(now))
+        advance_elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f'Напоминаний: {count}\n'
+            f'Планирование: {count / schedule_elapsed:,.0f} в секунду\n'
+            f'Перепланирование: '
+            f'{(count // 10) / reschedule_elapsed:,.0f} в секунду\n'
+            f'Срабатывание: {fired / advance_elapsed:,.0f} в секунду '
+            f'(шаг 60 с)\n'
+            f'Память: {memory / count:.0f} байт на напоминание'
+        )
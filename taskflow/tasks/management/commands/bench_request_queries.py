@@ -0,0 +1,196 @@
+import json
+import tempfile
+from collections import defaultdict
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from tasks import urls as task_urls
+from tasks.auth import invalidate_cached_user
+from tasks.calendar import feed_token
+from tasks.exports import export_header, write_chunk
+from tasks.models import ExportJob, Task
+
+from ._bench import bench_databases, create_bench_user, seed_tasks
+
+BASELINE = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+    'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+}
+
+# Выход завершает сессию бенчмарка, удаление задачи необратимо (удаление
+# с восстановлением измеряется парой tasks_bulk_delete/tasks_restore),
+# сброс ссылки делает недействительным адрес календаря.
+SKIPPED_URLS = {'logout', 'task_delete', 'calendar_feed_reset'}
+
+DUE_FORMAT = '%Y-%m-%dT%H:%M'
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает число SQL-запросов на запрос с быстрой сессией и без неё'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=200)
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=3,
+            help='Число повторных запросов к каждому адресу'
+        )
+
+    def handle(self, *args, **options):
+        with bench_databases(), tempfile.TemporaryDirectory() as directory, \
+                override_settings(EXPORT_ROOT=Path(directory)):
+            user = create_bench_user()
+            seed_tasks(user, options['tasks'])
+            requests = self.task_requests(user)
+            baseline = self.measure(requests, options['requests'], BASELINE)
+            fast = self.measure(requests, options['requests'], {})
+
+        self.stdout.write(
+            f'{"Запрос":<48} {"Было":>6} {"Стало":>6} {"Разница":>8}'
+        )
+        failed = []
+        for label, *request in requests:
+            before, after = baseline[label], fast[label]
+            if before is None or after is None:
+                failed.append(label)
+                self.stdout.write(f'{label:<48} {"—":>6} {"—":>6}')
+                continue
+            self.stdout.write(
+                f'{label:<48} {before:>6.1f} {after:>6.1f} '
+                f'{before - after:>8.1f}'
+            )
+        measured = [
+            label for label, *request in requests if label not in failed
+        ]
+        total_before = sum(baseline[label] for label in measured)
+        total_after = sum(fast[label] for label in measured)
+        for label in failed:
+            self.stderr.write(
+                f'{label}: неожиданный код ответа, в сумму не включено'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего запросов на проход: {total_before:.1f} -> '
+            f'{total_after:.1f} (-{total_before - total_after:.1f})'
+        ))
+
+    def task_requests(self, user):
+        tasks = Task.objects.for_user(user).order_by('pk')
+        task, removable = tasks[0], tasks[1]
+        job = ExportJob.objects.create(user=user, state='done')
+        job.bytes_written = write_chunk(job, export_header(None))
+        job.save(update_fields=['bytes_written', 'updated_at'])
+        due_date = (
+            timezone.localtime() + timezone.timedelta(days=7)
+        ).strftime(DUE_FORMAT)
+        form = {
+            'title': task.title,
+            'description': task.description or '',
+            'due_date': due_date,
+            'status': 'todo',
+        }
+        kwargs = {
+            'pk': task.pk,
+            'token': feed_token(user),
+        }
+        requests = {
+            'dashboard': [('GET', None, 200)],
+            'tasks_list': [('GET', None, 200)],
+            'task_detail': [('GET', None, 200)],
+            'task_create': [
+                ('GET', None, 200),
+                ('POST', {**form, 'allow_duplicate': '1'}, 302),
+            ],
+            'task_update': [('GET', None, 200), ('POST', form, 302)],
+            'tasks_bulk_delete': [
+                ('POST', {'task_ids': [removable.pk]}, 302),
+            ],
+            'tasks_restore': [('POST', {}, 302)],
+            'update_task_status': [('POST', {'status': 'in_progress'}, 200)],
+            'analytics': [('GET', None, 200)],
+            'auth': [('GET', None, 200)],
+            'tasks_stats_api': [('GET', None, 200)],
+            'sync_tasks': [('GET', {'since': '0'}, 200)],
+            'export_tasks': [('GET', None, 200)],
+            'calendar_feed': [('GET', None, 200)],
+            'export_job_create': [('POST', {'status': 'todo'}, 202)],
+            'export_job_status': [('GET', None, 200)],
+            'export_job_download': [('GET', None, 200)],
+        }
+        result = []
+        for pattern in task_urls.urlpatterns:
+            if pattern.name in SKIPPED_URLS:
+                continue
+            if pattern.name not in requests:
+                raise CommandError(
+                    f'Не описан запрос для адреса {pattern.name}'
+                )
+            path_kwargs = {
+                name: kwargs[name] for name in pattern.pattern.converters
+            }
+            if pattern.name.startswith('export_job_') and 'pk' in path_kwargs:
+                path_kwargs['pk'] = job.pk
+            path = reverse(pattern.name, kwargs=path_kwargs)
+            for method, data, status in requests[pattern.name]:
+                result.append((
+                    f'{method} /{pattern.pattern}', method, path, data, status
+                ))
+        return result
+
+    def measure(self, requests, repeat, overrides):
+        with override_settings(ALLOWED_HOSTS=['testserver'], **overrides):
+            cache.clear()
+            invalidate_cached_user()
+            client = Client()
+            client.login(username='bench', password='bench')
+            client.get(reverse('dashboard'))
+            # Проходы повторяются целиком, чтобы парные запросы (удаление
+            # и восстановление) каждый раз выполнялись по порядку.
+            totals = defaultdict(int)
+            failed = set()
+            for _ in range(repeat):
+                for label, method, path, data, status in requests:
+                    with ExitStack() as stack:
+                        contexts = [
+                            stack.enter_context(
+                                CaptureQueriesContext(connections[alias])
+                            )
+                            for alias in settings.DATABASES
+                        ]
+                        response = self.send(client, method, path, data)
+                    # Фоновые экспорты ограничены числом активных на
+                    # пользователя, поэтому созданные задания сразу
+                    # считаются выполненными.
+                    ExportJob.objects.filter(state='pending').update(
+                        state='done'
+                    )
+                    if response.status_code != status:
+                        failed.add(label)
+                    totals[label] += sum(len(context) for context in contexts)
+        return {
+            label: None if label in failed else totals[label] / repeat
+            for label, *request in requests
+        }
+
+    def send(self, client, method, path, data):
+        if method == 'GET':
+            response = client.get(path, data)
+        elif path.endswith('/update-status/'):
+            response = client.post(
+                path, json.dumps(data), content_type='application/json'
+            )
+        else:
+            response = client.post(path, data)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        response.close()
+        return response
@@ -0,0 +1,130 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from tasks.board import board_differences, board_stats, get_board
+from tasks.models import Task
+from tasks.sharding import shard_for_user
+
+from ._bench import bench_databases, create_bench_user, random_title, seed_tasks
+
+DUE_FORMAT = '%Y-%m-%dT%H:%M'
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет снимки досок задач в памяти: случайные изменения через '
+        'представления, сверка с базой и расход памяти на пользователя'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--tasks', type=int, default=200)
+        parser.add_argument(
+            '--operations',
+            type=int,
+            default=100,
+            help='Число изменений задач на пользователя'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with bench_databases(), override_settings(
+                ALLOWED_HOSTS=['testserver']):
+            clients = []
+            for index in range(options['users']):
+                user = create_bench_user(f'board{index}')
+                seed_tasks(user, options['tasks'], seed=index)
+                client = Client()
+                client.force_login(user)
+                client.get(reverse('dashboard'))
+                clients.append((user, client))
+
+            for _ in range(options['operations']):
+                for user, client in clients:
+                    self.change_task(rng, user, client)
+
+            task_queries = self.dashboard_task_queries(*clients[0])
+            differences = {
+                user.username: board_differences(user)
+                for user, client in clients
+            }
+            stats = board_stats()
+
+        for username, user_differences in differences.items():
+            for difference in user_differences:
+                self.stdout.write(f'{username}: {difference}')
+        cards = sum(count for user_id, count, size in stats)
+        memory = sum(size for user_id, count, size in stats)
+        self.stdout.write(
+            f'Снимков в памяти: {len(stats)}, карточек: {cards}, '
+            f'память: {memory / 1024:.0f} КБ'
+        )
+        if stats:
+            sizes = sorted(size for user_id, count, size in stats)
+            self.stdout.write(
+                f'На пользователя: в среднем {memory / len(stats) / 1024:.1f} '
+                f'КБ, максимум {sizes[-1] / 1024:.1f} КБ, '
+                f'{memory / max(cards, 1):.0f} байт на карточку'
+            )
+        self.stdout.write(
+            f'Запросов к таблице задач при открытии доски: {task_queries}'
+        )
+        broken = sum(bool(items) for items in differences.values())
+        if broken:
+            raise CommandError(f'Снимки расходятся с базой: {broken}')
+        self.stdout.write(self.style.SUCCESS('Снимки совпадают с базой'))
+
+    def change_task(self, rng, user, client):
+        pks = list(get_board(user).cards)
+        pk = rng.choice(pks) if pks else None
+        now = timezone.localtime()
+        action = rng.choice([
+            'create', 'status', 'edit', 'overdue', 'delete', 'restore',
+            'dashboard'
+        ])
+        if action == 'create' or pk is None:
+            client.post(reverse('task_create'), {
+                'title': random_title(rng),
+                'description': '',
+                'due_date': (
+                    now + timezone.timedelta(hours=rng.randint(-48, 480))
+                ).strftime(DUE_FORMAT),
+                'allow_duplicate': '1',
+            })
+        elif action == 'status':
+            client.post(
+                reverse('update_task_status', kwargs={'pk': pk}),
+                {'status': rng.choice(['todo', 'in_progress', 'done'])},
+                content_type='application/json'
+            )
+        elif action in ('edit', 'overdue'):
+            hours = -1 if action == 'overdue' else rng.randint(1, 480)
+            client.post(reverse('task_update', kwargs={'pk': pk}), {
+                'title': random_title(rng),
+                'description': random_title(rng),
+                'due_date': (
+                    now + timezone.timedelta(hours=hours)
+                ).strftime(DUE_FORMAT),
+                'status': rng.choice(['todo', 'in_progress']),
+            })
+        elif action == 'delete':
+            client.post(reverse('task_delete', kwargs={'pk': pk}))
+        elif action == 'restore':
+            client.post(reverse('tasks_restore'))
+        else:
+            client.get(reverse('dashboard'))
+
+    def dashboard_task_queries(self, user, client):
+        client.get(reverse('dashboard'))
+        table = Task._meta.db_table
+        with CaptureQueriesContext(connections[shard_for_user(user.pk)]) as (
+                context):
+            client.get(reverse('dashboard'))
+        return sum(table in query['sql'] for query in context.captured_queries)
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.models import TaskChange
+from tasks.sharding import scatter_gather
+from tasks.sync import compact_changes
+
+
+class Command(BaseCommand):
+    help = 'Сжимает журнал изменений задач для дельта-синхронизации'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.TASK_SYNC_TOMBSTONE_DAYS,
+            help='Срок хранения записей об удалении (в днях)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.TASK_SYNC_BATCH_SIZE,
+            help='Количество записей в одной транзакции'
+        )
+
+    def handle(self, *args, **options):
+        before = self.count()
+        removed = compact_changes(options['days'], options['batch_size'])
+        for alias, count in removed.items():
+            self.stdout.write(f'[{alias}] Удалено записей журнала: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Журнал изменений: {before} -> {self.count()}'
+        ))
+
+    def count(self):
+        return sum(scatter_gather(
+            lambda alias: TaskChange.objects.using(alias).count()
+        ))
@@ -0,0 +1,320 @@
+import http.client
+import json
+import math
+import random
+import tempfile
+import threading
+import time
+from argparse import ArgumentTypeError
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from importlib import import_module
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY)
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import (ThreadedWSGIServer,
+                                          WSGIRequestHandler)
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from tasks.models import Task
+
+from ._bench import bench_databases, create_bench_user, percentile, seed_tasks
+
+CSRF_TOKEN = get_random_string(32)
+
+DRAG_STATUSES = ['todo', 'in_progress', 'done']
+
+
+def dashboard(rng, pks):
+    return 'GET', reverse('dashboard'), None
+
+
+def update_status(rng, pks):
+    return (
+        'POST',
+        reverse('update_task_status', kwargs={'pk': rng.choice(pks)}),
+        json.dumps({'status': rng.choice(DRAG_STATUSES)})
+    )
+
+
+def tasks_list(rng, pks):
+    page = rng.randint(1, len(pks) // 10 + 1)
+    return 'GET', f'{reverse("tasks_list")}?page={page}', None
+
+
+def analytics(rng, pks):
+    return 'GET', reverse('analytics'), None
+
+
+def export(rng, pks):
+    return 'GET', reverse('export_tasks'), None
+
+
+SCENARIOS = {
+    'dashboard': dashboard,
+    'status': update_status,
+    'list': tasks_list,
+    'analytics': analytics,
+    'export': export,
+}
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve():
+    server = ThreadedWSGIServer(
+        ('127.0.0.1', 0),
+        QuietRequestHandler,
+        allow_reuse_address=False
+    )
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+@contextmanager
+def file_test_databases():
+    # В памяти SQLite не показывает блокировок при конкурентной записи,
+    # поэтому тестовые базы создаются во временных файлах.
+    with tempfile.TemporaryDirectory() as directory:
+        for alias in settings.DATABASES:
+            connection = connections[alias]
+            if connection.vendor == 'sqlite':
+                connection.settings_dict['TEST']['NAME'] = str(
+                    Path(directory) / f'{alias}.sqlite3'
+                )
+        with bench_databases():
+            yield
+
+
+def session_cookie(user):
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return (
+        f'{settings.SESSION_COOKIE_NAME}={session.session_key}; '
+        f'{settings.CSRF_COOKIE_NAME}={CSRF_TOKEN}'
+    )
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name not in SCENARIOS:
+            raise ArgumentTypeError(
+                f'Неизвестный сценарий {name}. '
+                f'Доступны: {", ".join(SCENARIOS)}'
+            )
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            mix[name] = None
+        if mix[name] is None or not 0 <= mix[name] < math.inf:
+            raise ArgumentTypeError(
+                f'Неверная доля сценария {name}: {weight}'
+            )
+    if not any(mix.values()):
+        raise ArgumentTypeError(
+            'Хотя бы одна доля сценария должна быть больше нуля'
+        )
+    return mix
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест: запускает приложение локально и нагружает его '
+        'смесью запросов от одновременно работающих пользователей'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=20,
+            help='Число одновременно работающих пользователей'
+        )
+        parser.add_argument(
+            '--tasks',
+            type=int,
+            default=200,
+            help='Число задач у каждого пользователя'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=30,
+            help='Длительность нагрузки в секундах'
+        )
+        parser.add_argument(
+            '--mix',
+            type=parse_mix,
+            default=settings.LOADTEST_MIX,
+            help='Доли сценариев, например dashboard=40,status=25,list=20'
+        )
+        parser.add_argument(
+            '--p95',
+            type=float,
+            default=settings.LOADTEST_SLO_P95_MS,
+            help='Допустимый p95 времени ответа, мс'
+        )
+        parser.add_argument(
+            '--p99',
+            type=float,
+            default=settings.LOADTEST_SLO_P99_MS,
+            help='Допустимый p99 времени ответа, мс'
+        )
+        parser.add_argument(
+            '--max-error-rate',
+            type=float,
+            default=settings.LOADTEST_MAX_ERROR_RATE,
+            help='Допустимая доля ошибок'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with file_test_databases(), override_settings(
+                DEBUG=False, ALLOWED_HOSTS=['127.0.0.1']):
+            workers = []
+            for index in range(options['users']):
+                user = create_bench_user(f'load{index}')
+                seed_tasks(
+                    user,
+                    options['tasks'],
+                    seed=options['seed'] + index
+                )
+                workers.append((
+                    session_cookie(user),
+                    list(Task.objects.for_user(user).values_list(
+                        'pk', flat=True
+                    ))
+                ))
+            self.stdout.write(
+                f'Пользователей: {len(workers)}, задач у каждого: '
+                f'{options["tasks"]}, нагрузка {options["duration"]:.0f} с'
+            )
+            with serve() as port:
+                results, elapsed = self.run_load(
+                    port, workers, options['mix'], options['duration'],
+                    options['seed']
+                )
+        self.report(results, elapsed, options)
+
+    def run_load(self, port, workers, mix, duration, seed):
+        results = [defaultdict(list) for _ in workers]
+        deadline = time.monotonic() + duration
+        threads = [
+            threading.Thread(
+                target=self.simulate_user,
+                args=(port, cookie, pks, mix, deadline, seed + index,
+                      results[index])
+            )
+            for index, (cookie, pks) in enumerate(workers)
+        ]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        merged = defaultdict(list)
+        for user_results in results:
+            for name, samples in user_results.items():
+                merged[name].extend(samples)
+        return merged, elapsed
+
+    def simulate_user(self, port, cookie, pks, mix, deadline, seed, results):
+        rng = random.Random(seed)
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        headers = {'Cookie': cookie, 'X-CSRFToken': CSRF_TOKEN}
+        try:
+            while time.monotonic() < deadline:
+                name = rng.choices(names, weights)[0]
+                started = time.perf_counter()
+                try:
+                    method, path, body = SCENARIOS[name](rng, pks)
+                    connection.request(method, path, body, {
+                        **headers,
+                        'Content-Type': 'application/json',
+                    })
+                    response = connection.getresponse()
+                    response.read()
+                    error = None if 200 <= response.status < 300 else (
+                        f'HTTP {response.status}'
+                    )
+                except Exception as exc:
+                    error = type(exc).__name__
+                    connection.close()
+                results[name].append((time.perf_counter() - started, error))
+        finally:
+            connection.close()
+
+    def report(self, results, elapsed, options):
+        rows = [(name, results[name]) for name in options['mix']]
+        rows.append(('всего', [
+            sample for samples in results.values() for sample in samples
+        ]))
+        self.stdout.write(
+            f'{"Сценарий":<12} {"Запросов":>9} {"Ошибок, %":>10} '
+            f'{"p50, мс":>9} {"p95, мс":>9} {"p99, мс":>9}'
+        )
+        violations = []
+        error_kinds = []
+        for name, samples in rows:
+            if not samples:
+                self.stdout.write(f'{name:<12} {0:>9}')
+                continue
+            timings = [seconds * 1000 for seconds, error in samples]
+            errors = Counter(error for seconds, error in samples if error)
+            error_rate = sum(errors.values()) / len(samples)
+            p50, p95, p99 = (
+                percentile(timings, percent) for percent in (50, 95, 99)
+            )
+            self.stdout.write(
+                f'{name:<12} {len(samples):>9} {error_rate * 100:>10.1f} '
+                f'{p50:>9.0f} {p95:>9.0f} {p99:>9.0f}'
+            )
+            if p95 > options['p95']:
+                violations.append(f'{name}: p95 {p95:.0f} мс')
+            if p99 > options['p99']:
+                violations.append(f'{name}: p99 {p99:.0f} мс')
+            if error_rate > options['max_error_rate']:
+                violations.append(f'{name}: ошибок {error_rate:.1%}')
+            if errors and name != 'всего':
+                error_kinds.append(f'{name}: ' + ', '.join(
+                    f'{error} × {count}' for error, count in errors.items()
+                ))
+
+        for line in error_kinds:
+            self.stdout.write(f'Ошибки {line}')
+        total = len(rows[-1][1])
+        self.stdout.write(
+            f'Пропускная способность: {total / elapsed:.1f} запросов/с'
+        )
+        if not total:
+            violations.append('не выполнено ни одного запроса')
+        if violations:
+            raise CommandError(f'Нарушены SLO: {"; ".join(violations)}')
+        self.stdout.write(self.style.SUCCESS('SLO выполнены'))
@@ -0,0 +1,131 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models.fields import AutoFieldMixin
+
+from tasks.board import invalidate_boards
+from tasks.models import AbstractTask, UserShard
+from tasks.sharding import (delete_by_pk, shard_cache_key, shard_for_user,
+                            sharded_models, user_rows)
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит задачи пользователей в другую базу данных (шард) '
+        'пакетами. На время переноса пользователь не должен изменять задачи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='+')
+        parser.add_argument(
+            '--to',
+            required=True,
+            help='Псевдоним базы данных из TASK_SHARDS'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        target = options['to']
+        if target not in settings.TASK_SHARDS:
+            raise CommandError(
+                f'Неизвестный шард {target}. '
+                f'Доступны: {", ".join(settings.TASK_SHARDS)}'
+            )
+        for username in options['usernames']:
+            try:
+                user = User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {username} не найден')
+            self.move_user(user, target, options['batch_size'])
+
+    def move_user(self, user, target, batch_size):
+        source = shard_for_user(user.pk)
+        if source == target:
+            self.stdout.write(f'{user}: уже в {target}')
+            return
+
+        # Строки пользователя в целевой базе остались от прерванного
+        # переноса: пользователь туда не направлен, поэтому они устарели.
+        for model in sharded_models():
+            self.delete_rows(model, user, target, batch_size)
+        try:
+            for model in sharded_models():
+                copied = self.copy_rows(
+                    model, user, source, target, batch_size
+                )
+                self.stdout.write(
+                    f'{user}: {model._meta.verbose_name_plural} '
+                    f'скопировано {copied} ({source} -> {target})'
+                )
+        except Exception as e:
+            for model in sharded_models():
+                self.delete_rows(model, user, target, batch_size)
+            raise CommandError(
+                f'{user}: перенос в {target} отменён, скопированные строки '
+                f'удалены: {e}'
+            )
+
+        UserShard.objects.update_or_create(
+            user=user,
+            defaults={'alias': target}
+        )
+        cache.delete(shard_cache_key(user.pk))
+        invalidate_boards([user.pk])
+
+        for model in sharded_models():
+            deleted = self.delete_rows(model, user, source, batch_size)
+            self.stdout.write(
+                f'{user}: {model._meta.verbose_name_plural} '
+                f'удалено из {source}: {deleted}'
+            )
+        self.stdout.write(self.style.SUCCESS(f'{user}: перенесён в {target}'))
+
+    def copy_rows(self, model, user, source, target, batch_size):
+        connection = connections[target]
+        quote = connection.ops.quote_name
+        # Идентификаторы задач общие для всех шардов и сохраняются; прочие
+        # автоинкрементные ключи ни на что не ссылаются и выдаются заново
+        # из диапазона целевой базы.
+        fields = [
+            field for field in model._meta.concrete_fields
+            if not (field.primary_key and isinstance(field, AutoFieldMixin)
+                    and not issubclass(model, AbstractTask))
+        ]
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(model._meta.db_table),
+            ', '.join(quote(field.column) for field in fields),
+            ', '.join(['%s'] * len(fields))
+        )
+        rows = user_rows(model, user.pk, source).values_list(
+            'pk', *[field.attname for field in fields]
+        )
+        copied = 0
+        last_pk = None
+        while True:
+            batch = rows.filter(pk__gt=last_pk) if last_pk else rows
+            batch = list(batch[:batch_size])
+            if not batch:
+                return copied
+            values = [
+                [
+                    field.get_db_prep_save(value, connection)
+                    for field, value in zip(fields, row[1:])
+                ]
+                for row in batch
+            ]
+            with transaction.atomic(using=target):
+                with connection.cursor() as cursor:
+                    cursor.executemany(sql, values)
+            copied += len(batch)
+            last_pk = batch[-1][0]
+
+    def delete_rows(self, model, user, alias, batch_size):
+        rows = user_rows(model, user.pk, alias)
+        deleted = 0
+        while True:
+            pks = list(rows.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return deleted
+            deleted += delete_by_pk(model, alias, pks)
@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.purge import claim_user_purge, purge_deleted_tasks, purge_user
+
+
+class Command(BaseCommand):
+    help = (
+        'Окончательно удаляет задачи и пользователей, срок отмены удаления '
+        'которых истёк, небольшими пакетами с паузами'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Обработать текущую очередь и завершиться'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=60.0,
+            help='Пауза между проходами (в секундах)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.TASK_PURGE_BATCH_SIZE,
+            help='Количество строк в одной транзакции'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=settings.TASK_PURGE_PAUSE_SECONDS,
+            help='Пауза между пакетами (в секундах)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pause = options['pause']
+        while True:
+            purged = purge_deleted_tasks(batch_size, pause)
+            if purged:
+                self.stdout.write(f'Удалено задач: {purged}')
+
+            while True:
+                purge = claim_user_purge()
+                if purge is None:
+                    break
+                deleted = purge_user(purge, batch_size, pause)
+                self.stdout.write(self.style.SUCCESS(
+                    f'Пользователь #{purge.user_id} удалён, '
+                    f'строк в шарде: {deleted}'
+                ))
+
+            if options['once']:
+                return
+            time.sleep(options['poll_interval'])
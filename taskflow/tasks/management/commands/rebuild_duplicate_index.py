@@ -0,0 +1,53 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.duplicates import rebuild_index
+from tasks.sharding import shard_for_user
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает индекс поиска похожих задач (MinHash LSH)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames',
+            nargs='*',
+            help='Пользователи (по умолчанию — все)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.DUPLICATE_INDEX_BATCH_SIZE,
+            help='Количество задач в одной вставке'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['usernames']:
+            targets = []
+            for username in options['usernames']:
+                try:
+                    user = User.objects.get(username=username)
+                except User.DoesNotExist:
+                    raise CommandError(f'Пользователь {username} не найден')
+                targets.append((shard_for_user(user.pk), user.pk))
+        else:
+            targets = [(alias, None) for alias in settings.TASK_SHARDS]
+
+        total = 0
+        for alias, user_id in targets:
+            total += rebuild_index(
+                alias,
+                user_id,
+                options['batch_size'],
+                on_batch=lambda indexed, alias=alias: self.stdout.write(
+                    f'[{alias}] Проиндексировано: {indexed}'
+                )
+            )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано задач: {total} за {elapsed:.1f} с'
+        ))
@@ -0,0 +1,176 @@
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+
+import pymorphy2
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.utils import timezone
+
+from tasks.board import invalidate_boards
+from tasks.models import Task
+from tasks.priority_rules import current_rules
+from tasks.sync import record_changes
+
+analyzer = None
+
+
+def init_worker():
+    global analyzer
+    analyzer = pymorphy2.MorphAnalyzer()
+
+
+def lemmatize(title):
+    return title, Task.title_lemmas(title, analyzer)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает приоритет всех задач после изменения правил '
+        'приоритета'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Количество процессов для лемматизации'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Размер порции при чтении задач из базы'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пакета bulk_update'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        lemmas = self.lemmatize_titles(
+            options['workers'],
+            options['chunk_size']
+        )
+        self.stdout.write(
+            f'Уникальных названий: {len(lemmas)} '
+            f'за {time.monotonic() - started:.1f} с'
+        )
+
+        started = time.monotonic()
+        processed, changed = self.update_priorities(
+            lemmas,
+            current_rules(),
+            options['chunk_size'],
+            options['batch_size'],
+            started
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано задач: {processed}, изменён приоритет: {changed}, '
+            f'{processed / elapsed if elapsed else processed:.0f} задач/с'
+        ))
+
+    def lemmatize_titles(self, workers, chunk_size):
+        lemmas = {}
+        connections.close_all()
+        with multiprocessing.Pool(workers, initializer=init_worker) as pool:
+            results = pool.imap_unordered(
+                lemmatize,
+                self.distinct_titles(chunk_size),
+                chunksize=100
+            )
+            for title, title_lemmas in results:
+                lemmas[title] = title_lemmas
+        return lemmas
+
+    def distinct_titles(self, chunk_size):
+        seen = set()
+        for alias in settings.TASK_SHARDS:
+            titles = Task.objects.using(alias).values_list(
+                'title', flat=True
+            ).distinct()
+            for title in titles.iterator(chunk_size=chunk_size):
+                if title and title.strip() and title not in seen:
+                    seen.add(title)
+                    yield title
+
+    def update_priorities(self, lemmas, rules, chunk_size, batch_size,
+                          started):
+        processed = changed = 0
+        weights = {}
+        for alias in settings.TASK_SHARDS:
+            shard_processed, shard_changed = self.update_shard(
+                alias, lemmas, rules, weights, chunk_size, batch_size,
+                started, processed
+            )
+            processed += shard_processed
+            changed += shard_changed
+        return processed, changed
+
+    def update_shard(self, alias, lemmas, rules, weights, chunk_size,
+                     batch_size, started, processed_before):
+        now = timezone.now()
+        tasks = Task.objects.using(alias).values_list(
+            'pk', 'user_id', 'title', 'due_date', 'priority'
+        ).order_by('pk')
+        processed = changed = 0
+        batch = []
+        for pk, user_id, title, due_date, priority in tasks.iterator(
+                chunk_size=chunk_size):
+            processed += 1
+            if title in lemmas:
+                key = (
+                    user_id if rules.has_overrides(user_id) else None,
+                    title
+                )
+                if key not in weights:
+                    weights[key] = rules.weight(lemmas[title], user_id)
+                new_priority = Task.priority_from_weight(
+                    weights[key], due_date, now
+                )
+            else:
+                new_priority = 'medium'
+            if new_priority != priority:
+                batch.append(Task(
+                    pk=pk,
+                    user_id=user_id,
+                    priority=new_priority,
+                    priority_rank=Task.PRIORITY_RANKS[new_priority],
+                    updated_at=now
+                ))
+            if len(batch) >= batch_size:
+                changed += self.flush(alias, batch)
+                batch = []
+            if processed % chunk_size == 0:
+                total = processed_before + processed
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'[{alias}] Обработано: {total}, '
+                    f'изменено: {changed + len(batch)}, '
+                    f'{total / elapsed:.0f} задач/с'
+                )
+        changed += self.flush(alias, batch)
+        return processed, changed
+
+    def flush(self, alias, batch):
+        if not batch:
+            return 0
+        changed = defaultdict(list)
+        for task in batch:
+            changed[task.user_id].append(task.pk)
+        with transaction.atomic(using=alias):
+            Task.objects.using(alias).bulk_update(
+                batch,
+                ['priority', 'priority_rank', 'updated_at']
+            )
+            for user_id, pks in changed.items():
+                record_changes(user_id, pks, 'upsert', using=alias)
+            invalidate_boards(changed, alias)
+        return len(batch)
@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tasks.exports import claim_next_job, run_export_job
+
+
+class Command(BaseCommand):
+    help = 'Обрабатывает очередь фоновых экспортов задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Обработать текущую очередь и завершиться'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Пауза между опросами пустой очереди (в секундах)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.EXPORT_CHUNK_SIZE,
+            help='Количество задач в одном блоке файла'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+
+            started = time.monotonic()
+            self.stdout.write(
+                f'Экспорт #{job.pk}: старт с задачи {job.rows_written}'
+            )
+            try:
+                run_export_job(job, options['chunk_size'])
+            except Exception as e:
+                job.state = 'failed'
+                job.error = str(e)
+                job.finished_at = timezone.now()
+                job.save(update_fields=[
+                    'state', 'error', 'finished_at', 'updated_at'
+                ])
+                self.stderr.write(f'Экспорт #{job.pk}: ошибка {e}')
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f'Экспорт #{job.pk}: {job.rows_written} задач, '
+                f'{job.bytes_written} байт за '
+                f'{time.monotonic() - started:.1f} с'
+            ))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tasks.reminders import ReminderScheduler, set_scheduler
+
+
+class Command(BaseCommand):
+    help = 'Отправляет напоминания о приближающихся сроках задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Период проверки (в секундах)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить одну итерацию и завершиться'
+        )
+
+    def handle(self, *args, **options):
+        scheduler = ReminderScheduler()
+        set_scheduler(scheduler)
+        while True:
+            now = timezone.now()
+            scheduler.poll_changes()
+            loaded = scheduler.load_window(now)
+            delivered = scheduler.tick(now)
+            if loaded or delivered:
+                self.stdout.write(
+                    f'{now:%H:%M:%S} загружено: {loaded}, '
+                    f'отправлено: {delivered}, '
+                    f'ожидают: {len(scheduler.wheel)}'
+                )
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_auto_20251125_2335'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='Название')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Описание')),
+                ('due_date', models.DateTimeField(verbose_name='Срок выполнения')),
+                ('status', models.CharField(choices=[('overdue', 'Просроченные'), ('todo', 'К выполнению'), ('in_progress', 'В работе'), ('done', 'Выполнены')], default='todo', max_length=20, verbose_name='Статус')),
+                ('priority', models.CharField(blank=True, choices=[('high', 'Высокий'), ('medium', 'Средний'), ('low', 'Низкий')], max_length=10, verbose_name='Приоритет')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+                ('order', models.PositiveIntegerField(default=0, verbose_name='Порядок сортировки')),
+                ('original_status', models.CharField(blank=True, choices=[('overdue', 'Просроченные'), ('todo', 'К выполнению'), ('in_progress', 'В работе'), ('done', 'Выполнены')], help_text='Статус до перевода в "Просрочено"', max_length=20, null=True, verbose_name='Статус до перевода в "Просрочено"')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата архивации')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Архивная задача',
+                'verbose_name_plural': 'Архив задач',
+            },
+        ),
+    ]
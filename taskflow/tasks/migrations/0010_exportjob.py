@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_archivedtask'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status_filter', models.CharField(blank=True, max_length=20, verbose_name='Фильтр по статусу')),
+                ('sort', models.CharField(default='id', max_length=20, verbose_name='Сортировка')),
+                ('state', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=20, verbose_name='Состояние')),
+                ('rows_written', models.PositiveIntegerField(default=0, verbose_name='Выгружено задач')),
+                ('bytes_written', models.PositiveBigIntegerField(default=0, verbose_name='Размер файла')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата завершения')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Фоновый экспорт',
+                'verbose_name_plural': 'Фоновые экспорты',
+                'indexes': [models.Index(fields=['state', 'created_at'], name='tasks_expor_state_2ad99a_idx'), models.Index(fields=['user', 'state'], name='tasks_expor_user_id_7c93f7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+PRIORITY_RANKS = {
+    'high': 3,
+    'medium': 2,
+    'low': 1,
+}
+
+
+def fill_priority_rank(apps, schema_editor):
+    rank = models.Case(
+        *[
+            models.When(priority=priority, then=models.Value(value))
+            for priority, value in PRIORITY_RANKS.items()
+        ],
+        default=models.Value(0)
+    )
+    for model_name in ('Task', 'ArchivedTask'):
+        model = apps.get_model('tasks', model_name)
+        model.objects.update(priority_rank=rank)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_exportjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedtask',
+            name='priority_rank',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Ранг приоритета'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='priority_rank',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Ранг приоритета'),
+        ),
+        migrations.RunPython(fill_priority_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'status', 'due_date', '-priority_rank'], name='task_board_idx'),
+        ),
+    ]
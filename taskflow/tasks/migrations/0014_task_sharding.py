@@ -0,0 +1,65 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def offset_task_ids(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.alias not in settings.TASK_SHARDS:
+        return
+    shard_index = settings.TASK_SHARDS.index(connection.alias)
+    offset = shard_index * settings.TASK_SHARD_ID_STRIDE
+    if not offset:
+        return
+    table = apps.get_model('tasks', 'Task')._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                'DELETE FROM sqlite_sequence WHERE name = %s', [table]
+            )
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                [table, offset]
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)",
+                [table, offset]
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0013_reminderoutbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedtask',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.CreateModel(
+            name='UserShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=100, verbose_name='База данных')),
+                ('moved_at', models.DateTimeField(auto_now=True, verbose_name='Дата переноса')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='task_shard', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Шард пользователя',
+                'verbose_name_plural': 'Шарды пользователей',
+            },
+        ),
+        migrations.RunPython(offset_task_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def offset_change_ids(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.alias not in settings.TASK_SHARDS:
+        return
+    shard_index = settings.TASK_SHARDS.index(connection.alias)
+    offset = shard_index * settings.TASK_SHARD_ID_STRIDE
+    if not offset:
+        return
+    table = apps.get_model('tasks', 'TaskChange')._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                'DELETE FROM sqlite_sequence WHERE name = %s', [table]
+            )
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                [table, offset]
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)",
+                [table, offset]
+            )
+
+
+def backfill_changes(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    if alias not in settings.TASK_SHARDS:
+        return
+    Task = apps.get_model('tasks', 'Task')
+    TaskChange = apps.get_model('tasks', 'TaskChange')
+    TaskSyncState = apps.get_model('tasks', 'TaskSyncState')
+    tokens = {}
+    batch = []
+    tasks = Task.objects.using(alias).order_by('user_id', 'pk').values_list(
+        'pk', 'user_id'
+    )
+    for pk, user_id in tasks.iterator(chunk_size=settings.TASK_SYNC_BATCH_SIZE):
+        tokens[user_id] = tokens.get(user_id, 0) + 1
+        batch.append(TaskChange(
+            user_id=user_id,
+            token=tokens[user_id],
+            task_id=pk,
+            op='upsert'
+        ))
+        if len(batch) >= settings.TASK_SYNC_BATCH_SIZE:
+            TaskChange.objects.using(alias).bulk_create(batch)
+            batch = []
+    TaskChange.objects.using(alias).bulk_create(batch)
+    TaskSyncState.objects.using(alias).bulk_create(
+        [
+            TaskSyncState(user_id=user_id, last_token=last_token)
+            for user_id, last_token in tokens.items()
+        ],
+        batch_size=settings.TASK_SYNC_BATCH_SIZE
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0014_task_sharding'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskSyncState',
+            fields=[
+                ('user', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_sync_state', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('last_token', models.PositiveBigIntegerField(default=0, verbose_name='Последний токен')),
+                ('horizon', models.PositiveBigIntegerField(default=0, verbose_name='Горизонт компактизации')),
+            ],
+            options={
+                'verbose_name': 'Состояние синхронизации',
+                'verbose_name_plural': 'Состояния синхронизации',
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.PositiveBigIntegerField(verbose_name='Токен')),
+                ('task_id', models.BigIntegerField(verbose_name='Задача')),
+                ('op', models.CharField(choices=[('upsert', 'Изменение'), ('delete', 'Удаление')], max_length=10, verbose_name='Операция')),
+                ('changed_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата изменения')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Изменение задачи',
+                'verbose_name_plural': 'Журнал изменений задач',
+                'indexes': [models.Index(fields=['user', 'task_id', 'token'], name='task_change_compact_idx'), models.Index(fields=['op', 'changed_at'], name='task_change_tombstone_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'token'), name='task_change_user_token_uniq')],
+            },
+        ),
+        migrations.RunPython(offset_change_ids, migrations.RunPython.noop),
+        migrations.RunPython(backfill_changes, migrations.RunPython.noop),
+    ]
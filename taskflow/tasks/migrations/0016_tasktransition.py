@@ -0,0 +1,95 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def offset_transition_ids(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.alias not in settings.TASK_SHARDS:
+        return
+    shard_index = settings.TASK_SHARDS.index(connection.alias)
+    offset = shard_index * settings.TASK_SHARD_ID_STRIDE
+    if not offset:
+        return
+    table = apps.get_model('tasks', 'TaskTransition')._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                'DELETE FROM sqlite_sequence WHERE name = %s', [table]
+            )
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                [table, offset]
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)",
+                [table, offset]
+            )
+
+
+def backfill_transitions(apps, schema_editor):
+    # Прежняя история статусов не сохранялась: восстанавливаем создание
+    # задачи и переход в текущий статус на момент последнего изменения.
+    alias = schema_editor.connection.alias
+    if alias not in settings.TASK_SHARDS:
+        return
+    Task = apps.get_model('tasks', 'Task')
+    TaskTransition = apps.get_model('tasks', 'TaskTransition')
+    batch = []
+    tasks = Task.objects.using(alias).order_by('pk').values_list(
+        'pk', 'user_id', 'status', 'created_at', 'updated_at'
+    )
+    chunk_size = settings.ANALYTICS_STREAM_CHUNK_SIZE
+    for pk, user_id, status, created_at, updated_at in tasks.iterator(
+            chunk_size=chunk_size):
+        batch.append(TaskTransition(
+            user_id=user_id,
+            task_id=pk,
+            from_status=None,
+            to_status='todo',
+            changed_at=created_at
+        ))
+        if status != 'todo':
+            batch.append(TaskTransition(
+                user_id=user_id,
+                task_id=pk,
+                from_status='todo',
+                to_status=status,
+                changed_at=max(created_at, updated_at)
+            ))
+        if len(batch) >= chunk_size:
+            TaskTransition.objects.using(alias).bulk_create(batch)
+            batch = []
+    TaskTransition.objects.using(alias).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0015_task_change_log'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.BigIntegerField(verbose_name='Задача')),
+                ('from_status', models.CharField(blank=True, choices=[('overdue', 'Просроченные'), ('todo', 'К выполнению'), ('in_progress', 'В работе'), ('done', 'Выполнены')], max_length=20, null=True, verbose_name='Предыдущий статус')),
+                ('to_status', models.CharField(blank=True, choices=[('overdue', 'Просроченные'), ('todo', 'К выполнению'), ('in_progress', 'В работе'), ('done', 'Выполнены')], max_length=20, null=True, verbose_name='Новый статус')),
+                ('changed_at', models.DateTimeField(verbose_name='Дата перехода')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Переход статуса',
+                'verbose_name_plural': 'История статусов',
+                'indexes': [models.Index(fields=['user', 'changed_at'], name='task_transition_range_idx'), models.Index(fields=['user', 'task_id', 'changed_at'], name='task_transition_task_idx')],
+            },
+        ),
+        migrations.RunPython(offset_transition_ids, migrations.RunPython.noop),
+        migrations.RunPython(backfill_transitions, migrations.RunPython.noop),
+    ]
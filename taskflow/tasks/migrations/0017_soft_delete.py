@@ -0,0 +1,70 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0016_tasktransition'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingUserPurge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('was_active', models.BooleanField(default=True, verbose_name='Был активен')),
+                ('requested_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата запроса')),
+                ('purge_after', models.DateTimeField(db_index=True, verbose_name='Удалить после')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начало удаления')),
+            ],
+            options={
+                'verbose_name': 'Удаление пользователя',
+                'verbose_name_plural': 'Удаления пользователей',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_board_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_user_updated_idx',
+        ),
+        migrations.AddField(
+            model_name='archivedtask',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата удаления'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата удаления'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['user', 'status', 'due_date', '-priority_rank'], name='task_board_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['user', 'updated_at'], name='task_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', False)), fields=['deleted_at'], name='task_deleted_idx'),
+        ),
+        migrations.AddField(
+            model_name='pendinguserpurge',
+            name='requested_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Кем запрошено'),
+        ),
+        migrations.AddField(
+            model_name='pendinguserpurge',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pending_purge', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+    ]
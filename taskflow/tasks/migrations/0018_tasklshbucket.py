@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def offset_bucket_ids(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.alias not in settings.TASK_SHARDS:
+        return
+    shard_index = settings.TASK_SHARDS.index(connection.alias)
+    offset = shard_index * settings.TASK_SHARD_ID_STRIDE
+    if not offset:
+        return
+    table = apps.get_model('tasks', 'TaskLshBucket')._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                'DELETE FROM sqlite_sequence WHERE name = %s', [table]
+            )
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                [table, offset]
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)",
+                [table, offset]
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0017_soft_delete'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskLshBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.BigIntegerField(verbose_name='Задача')),
+                ('bucket', models.BigIntegerField(verbose_name='Корзина LSH')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Корзина поиска дубликатов',
+                'verbose_name_plural': 'Индекс поиска дубликатов',
+                'indexes': [models.Index(fields=['user', 'bucket'], name='task_lsh_bucket_idx'), models.Index(fields=['task_id'], name='task_lsh_task_idx')],
+            },
+        ),
+        migrations.RunPython(offset_bucket_ids, migrations.RunPython.noop),
+    ]
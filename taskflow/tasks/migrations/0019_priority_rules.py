@@ -0,0 +1,108 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:57
+
+import re
+
+import django.db.models.deletion
+import pymorphy2
+from django.conf import settings
+from django.db import migrations, models, router
+
+
+IMPORTANT_WORDS_WEIGHTS = {
+    'отчёт': 10, 'отчет': 10, 'сбой': 10, 'ошибка': 10, 'авария': 10,
+    'штраф': 10, 'пени': 10, 'блокировка': 10, 'отключение': 10,
+    'взлом': 10, 'угроза': 10, 'риск': 9, 'проблема': 8, 'суд': 10,
+    'проверка': 8, 'инспекция': 9, 'расследование': 9, 'босс': 9,
+    'руководитель': 9, 'директор': 9, 'начальник': 8, 'клиент': 9,
+    'заказчик': 9, 'инвестор': 9, 'партнёр': 8, 'партнер': 8, 'главбух': 8,
+    'юрист': 8, 'адвокат': 8, 'врач': 9, 'договор': 9, 'контракт': 9,
+    'счёт': 9, 'счет': 9, 'платёж': 9, 'платеж': 9, 'оплата': 8, 'бюджет': 8,
+    'финансы': 8, 'налог': 9, 'прибыль': 7, 'KPI': 8, 'OKR': 8, 'аудит': 8,
+    'отчётность': 9, 'отчетность': 9, 'квартал': 7, 'годовой': 8,
+    'подготовить': 7, 'согласовать': 8, 'утвердить': 8, 'подписать': 8,
+    'представить': 7, 'предоставить': 7, 'сдать': 6, 'решить': 7,
+    'организовать': 6, 'провести': 6, 'отправить': 5, 'заключить': 7,
+    'настроить': 6, 'восстановить': 7, 'исправить': 7, 'встреча': 6,
+    'совещание': 6, 'конференция': 6, 'звонок': 5, 'переговоры': 8,
+    'планёрка': 5, 'планерка': 5, 'брифинг': 6, 'электронка': 5, 'письмо': 4,
+    'сообщение': 4, 'напоминание': 5, 'проект': 7, 'релиз': 8, 'деплой': 8,
+    'развёртывание': 8, 'развертывание': 8, 'тестирование': 6, 'дедлайн': 9,
+    'крайний срок': 10, 'сегодня': 5, 'завтра': 5, 'итоговый': 6,
+    'финальный': 7, 'здоровье': 9, 'лечение': 8, 'приём': 7, 'прием': 7,
+    'анализ': 7, 'УЗИ': 7, 'рентген': 7, 'рецепт': 6, 'температура': 7,
+    'травма': 9, 'госпитализация': 10, 'реанимация': 10, 'семья': 8,
+    'родители': 7, 'мама': 7, 'папа': 7, 'сын': 9, 'дочь': 9, 'ребёнок': 9,
+    'ребенок': 9, 'супруг': 7, 'супруга': 7, 'муж': 7, 'жена': 7, 'дом': 6,
+    'квартира': 6, 'аренда': 6, 'коммуналка': 6, 'свет': 5, 'вода': 5,
+    'газ': 5, 'квартплата': 7, 'ипотека': 9, 'наследство': 9, 'ремонт': 6,
+    'мастер': 5, 'протечка': 8, 'замок': 5, 'дверь': 5, 'интернет': 5,
+    'связь': 5, 'срочно': 8, 'экстренно': 9, 'немедленно': 9, 'важно': 7,
+    'критично': 9, 'приоритетно': 7, 'требуется': 6, 'необходимо': 6,
+    'нужно': 5, 'обязательно': 6, 'жду': 5, 'ждут': 5, 'давно': 4,
+}
+
+IGNORED_WORDS = {
+    'почта', 'электронная', 'кофе', 'обед', 'перерыв', 'отдых',
+    'прогулка', 'фильм', 'сериал', 'игры', 'музыка', 'отпуск',
+    'выходные', 'праздник', 'вечеринка', 'подарок', 'цветы'
+}
+
+
+def seed_rules(apps, schema_editor):
+    # Правила переносятся из прежних словарей в models.py. Фразы приводятся
+    # к леммам так же, как названия задач, поэтому варианты написания
+    # («отчёт» и «отчет») сливаются в одно правило с наибольшим весом.
+    PriorityRule = apps.get_model('tasks', 'PriorityRule')
+    alias = schema_editor.connection.alias
+    if not router.allow_migrate_model(alias, PriorityRule):
+        return
+    morph = pymorphy2.MorphAnalyzer()
+    rules = {}
+    phrases = [
+        (phrase, weight, False)
+        for phrase, weight in IMPORTANT_WORDS_WEIGHTS.items()
+    ] + [(phrase, 0, True) for phrase in sorted(IGNORED_WORDS)]
+    for phrase, weight, is_ignored in phrases:
+        lemmas = ' '.join(
+            morph.parse(word)[0].normal_form
+            for word in re.findall(r'[а-яё]+', phrase.lower())
+        )
+        if not lemmas:
+            continue
+        if lemmas not in rules or rules[lemmas].weight < weight:
+            rules[lemmas] = PriorityRule(
+                phrase=phrase,
+                lemmas=lemmas,
+                weight=weight,
+                is_ignored=is_ignored
+            )
+    PriorityRule.objects.using(alias).bulk_create(rules.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0018_tasklshbucket'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriorityRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phrase', models.CharField(max_length=200, verbose_name='Слово или фраза')),
+                ('lemmas', models.CharField(editable=False, max_length=200, verbose_name='Леммы')),
+                ('weight', models.PositiveSmallIntegerField(default=0, verbose_name='Вес')),
+                ('is_ignored', models.BooleanField(default=False, help_text='Фраза не влияет на приоритет, даже если задана общим правилом', verbose_name='Игнорировать')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+                ('user', models.ForeignKey(blank=True, help_text='Пусто — правило действует для всех пользователей', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='priority_rules', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Правило приоритета',
+                'verbose_name_plural': 'Правила приоритета',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('lemmas',), name='priority_rule_global_uniq'), models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('user', 'lemmas'), name='priority_rule_user_uniq')],
+            },
+        ),
+        migrations.RunPython(seed_rules, migrations.RunPython.noop),
+    ]
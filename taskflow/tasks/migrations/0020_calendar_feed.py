@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('tasks', '0019_priority_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarFeed',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='calendar_feed', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('secret', models.CharField(max_length=32, verbose_name='Секрет ссылки')),
+                ('reset_at', models.DateTimeField(auto_now=True, verbose_name='Дата сброса ссылки')),
+            ],
+            options={
+                'verbose_name': 'Лента календаря',
+                'verbose_name_plural': 'Ленты календаря',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0020_calendar_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='last_sort_value',
+            field=models.TextField(blank=True, verbose_name='Значение сортировки последней задачи'),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='last_task_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Последняя выгруженная задача'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0021_export_job_cursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Таблица')),
+                ('last_id', models.PositiveBigIntegerField(default=0, verbose_name='Последний выданный идентификатор')),
+            ],
+            options={
+                'verbose_name': 'Счётчик идентификаторов',
+                'verbose_name_plural': 'Счётчики идентификаторов',
+            },
+        ),
+    ]
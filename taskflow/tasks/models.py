@@ -1,53 +1,40 @@
 import re
 
 import pymorphy2
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, router, transaction
 from django.utils import timezone
 
 morph = pymorphy2.MorphAnalyzer()
 
-IMPORTANT_WORDS_WEIGHTS = {
-    'отчёт': 10, 'отчет': 10, 'сбой': 10, 'ошибка': 10, 'авария': 10,
-    'штраф': 10, 'пени': 10, 'блокировка': 10, 'отключение': 10,
-    'взлом': 10, 'угроза': 10, 'риск': 9, 'проблема': 8, 'суд': 10,
-    'проверка': 8, 'инспекция': 9, 'расследование': 9, 'босс': 9,
-    'руководитель': 9, 'директор': 9, 'начальник': 8, 'клиент': 9,
-    'заказчик': 9, 'инвестор': 9, 'партнёр': 8, 'партнер': 8, 'главбух': 8,
-    'юрист': 8, 'адвокат': 8, 'врач': 9, 'договор': 9, 'контракт': 9,
-    'счёт': 9, 'счет': 9, 'платёж': 9, 'платеж': 9, 'оплата': 8, 'бюджет': 8,
-    'финансы': 8, 'налог': 9, 'прибыль': 7, 'KPI': 8, 'OKR': 8, 'аудит': 8,
-    'отчётность': 9, 'отчетность': 9, 'квартал': 7, 'годовой': 8,
-    'подготовить': 7, 'согласовать': 8, 'утвердить': 8, 'подписать': 8,
-    'представить': 7, 'предоставить': 7, 'сдать': 6, 'решить': 7,
-    'организовать': 6, 'провести': 6, 'отправить': 5, 'заключить': 7,
-    'настроить': 6, 'восстановить': 7, 'исправить': 7, 'встреча': 6,
-    'совещание': 6, 'конференция': 6, 'звонок': 5, 'переговоры': 8,
-    'планёрка': 5, 'планерка': 5, 'брифинг': 6, 'электронка': 5, 'письмо': 4,
-    'сообщение': 4, 'напоминание': 5, 'проект': 7, 'релиз': 8, 'деплой': 8,
-    'развёртывание': 8, 'развертывание': 8, 'тестирование': 6, 'дедлайн': 9,
-    'крайний срок': 10, 'сегодня': 5, 'завтра': 5, 'итоговый': 6,
-    'финальный': 7, 'здоровье': 9, 'лечение': 8, 'приём': 7, 'прием': 7,
-    'анализ': 7, 'УЗИ': 7, 'рентген': 7, 'рецепт': 6, 'температура': 7,
-    'травма': 9, 'госпитализация': 10, 'реанимация': 10, 'семья': 8,
-    'родители': 7, 'мама': 7, 'папа': 7, 'сын': 9, 'дочь': 9, 'ребёнок': 9,
-    'ребенок': 9, 'супруг': 7, 'супруга': 7, 'муж': 7, 'жена': 7, 'дом': 6,
-    'квартира': 6, 'аренда': 6, 'коммуналка': 6, 'свет': 5, 'вода': 5,
-    'газ': 5, 'квартплата': 7, 'ипотека': 9, 'наследство': 9, 'ремонт': 6,
-    'мастер': 5, 'протечка': 8, 'замок': 5, 'дверь': 5, 'интернет': 5,
-    'связь': 5, 'срочно': 8, 'экстренно': 9, 'немедленно': 9, 'важно': 7,
-    'критично': 9, 'приоритетно': 7, 'требуется': 6, 'необходимо': 6,
-    'нужно': 5, 'обязательно': 6, 'жду': 5, 'ждут': 5, 'давно': 4,
-}
-
-IGNORED_WORDS = {
-    'почта', 'электронная', 'кофе', 'обед', 'перерыв', 'отдых',
-    'прогулка', 'фильм', 'сериал', 'игры', 'музыка', 'отпуск',
-    'выходные', 'праздник', 'вечеринка', 'подарок', 'цветы'
-}
-
-
-class Task(models.Model):
+IMPORTANT_WEIGHT_THRESHOLD = 8
+
+
+class TaskQuerySet(models.QuerySet):
+    def for_user(self, user):
+        from .sharding import shard_for_user
+
+        user_id = getattr(user, 'pk', user)
+        return self.using(shard_for_user(user_id)).filter(user_id=user_id)
+
+
+class TaskManager(models.Manager.from_queryset(TaskQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .sharding import allocate_task_ids
+
+        objs = list(objs)
+        missing = [obj for obj in objs if obj.pk is None]
+        for obj, pk in zip(missing, allocate_task_ids(len(missing))):
+            obj.pk = pk
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class AbstractTask(models.Model):
     STATUS_CHOICES = [
         ('overdue', 'Просроченные'),
         ('todo', 'К выполнению'),
@@ -59,6 +46,11 @@ class Task(models.Model):
         ('medium', 'Средний'),
         ('low', 'Низкий'),
     ]
+    PRIORITY_RANKS = {
+        'high': 3,
+        'medium': 2,
+        'low': 1,
+    }
 
     title = models.CharField(
         max_length=200,
@@ -93,6 +85,7 @@ class Task(models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_constraint=False,
         verbose_name='Пользователь'
     )
     order = models.PositiveIntegerField(
@@ -107,32 +100,63 @@ class Task(models.Model):
         verbose_name='Статус до перевода в "Просрочено"',
         help_text='Статус до перевода в "Просрочено"'
     )
+    priority_rank = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Ранг приоритета'
+    )
+    deleted_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Дата удаления'
+    )
 
-    @staticmethod
-    def calculate_priority(due_date, title):
-        if not title or not title.strip():
-            return 'medium'
-        title = title.strip()
+    objects = TaskManager()
+    all_objects = TaskQuerySet.as_manager()
 
-        words = re.findall(r'[а-яё]+', title.lower())
-        lemmas = set()
+    shard_user_field = 'user'
+
+    class Meta:
+        abstract = True
 
-        for word in words:
-            parsed = morph.parse(word)[0]
-            lemma = parsed.normal_form
-            lemmas.add(lemma)
 
-        filtered_lemmas = {
-            lemma for lemma in lemmas
-            if lemma in IMPORTANT_WORDS_WEIGHTS and lemma not in IGNORED_WORDS
-        }
-        total_weight = sum(
-            IMPORTANT_WORDS_WEIGHTS.get(lemma, 0)
-            for lemma in filtered_lemmas
+class Task(AbstractTask):
+    _loaded_status = None
+    _loaded_title = None
+    _lemmas = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get(
+            'status', models.DEFERRED
+        )
+        instance._loaded_title = instance.__dict__.get(
+            'title', models.DEFERRED
         )
+        return instance
+
+    @staticmethod
+    def title_lemmas(title, analyzer=None):
+        analyzer = analyzer or morph
+        words = re.findall(r'[а-яё]+', title.lower())
+        return [analyzer.parse(word)[0].normal_form for word in words]
+
+    @staticmethod
+    def title_weight(lemmas, user_id=None):
+        from .priority_rules import current_rules
+
+        return current_rules().weight(lemmas, user_id)
 
-        is_urgent = due_date < timezone.now() + timezone.timedelta(days=1)
-        is_important = total_weight >= 8
+    @staticmethod
+    def urgent_before(now=None):
+        return (now or timezone.now()) + timezone.timedelta(days=1)
+
+    @classmethod
+    def priority_from_weight(cls, weight, due_date, now=None):
+        is_urgent = due_date < cls.urgent_before(now)
+        is_important = weight >= IMPORTANT_WEIGHT_THRESHOLD
 
         if is_urgent and is_important:
             return 'high'
@@ -141,6 +165,44 @@ class Task(models.Model):
         else:
             return 'low'
 
+    @classmethod
+    def calculate_priority(cls, due_date, title, lemmas=None, user_id=None):
+        if not title or not title.strip():
+            return 'medium'
+        if lemmas is None:
+            lemmas = cls.title_lemmas(title.strip())
+        weight = cls.title_weight(lemmas, user_id)
+        return cls.priority_from_weight(weight, due_date)
+
+    @classmethod
+    def priority_update(cls, is_important, now=None):
+        urgent = models.Q(due_date__lt=cls.urgent_before(now))
+        if is_important:
+            urgent_priority, other_priority = 'high', 'medium'
+        else:
+            urgent_priority, other_priority = 'medium', 'low'
+        return {
+            'priority': models.Case(
+                models.When(urgent, then=models.Value(urgent_priority)),
+                default=models.Value(other_priority)
+            ),
+            'priority_rank': models.Case(
+                models.When(
+                    urgent,
+                    then=models.Value(cls.PRIORITY_RANKS[urgent_priority])
+                ),
+                default=models.Value(cls.PRIORITY_RANKS[other_priority])
+            ),
+        }
+
+    def lemmas(self):
+        if self._lemmas is None or self._lemmas[0] != self.title:
+            self._lemmas = (self.title, self.title_lemmas(self.title or ''))
+        return self._lemmas[1]
+
+    def title_changed(self):
+        return self._loaded_title not in (self.title, models.DEFERRED)
+
     def is_overdue(self):
         if self.due_date and self.status == 'overdue':
             return self.due_date < timezone.now()
@@ -149,9 +211,31 @@ class Task(models.Model):
     def save(self, *args, **kwargs):
         self.priority = self.calculate_priority(
             self.due_date,
-            self.title
+            self.title,
+            self.lemmas(),
+            self.user_id
         )
-        super().save(*args, **kwargs)
+        self.priority_rank = self.PRIORITY_RANKS[self.priority]
+        if self.pk is None:
+            from .sharding import next_task_id
+
+            self.pk = next_task_id()
+            kwargs['force_insert'] = True
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self
+        )
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            if self._loaded_status not in (self.status, models.DEFERRED):
+                TaskTransition.objects.using(using).create(
+                    user_id=self.user_id,
+                    task_id=self.pk,
+                    from_status=self._loaded_status,
+                    to_status=self.status,
+                    changed_at=self.updated_at
+                )
+        self._loaded_status = self.status
+        self._loaded_title = self.title
 
     def __str__(self):
         return self.title
@@ -159,3 +243,472 @@ class Task(models.Model):
     class Meta:
         verbose_name = 'Зачада'
         verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(
+                fields=['user', 'status', 'due_date', '-priority_rank'],
+                name='task_board_idx',
+                condition=models.Q(deleted_at__isnull=True)
+            ),
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='task_user_updated_idx',
+                condition=models.Q(deleted_at__isnull=True)
+            ),
+            models.Index(
+                fields=['deleted_at'],
+                name='task_deleted_idx',
+                condition=models.Q(deleted_at__isnull=False)
+            ),
+            models.Index(fields=['due_date'], name='task_due_date_idx'),
+            models.Index(fields=['updated_at'], name='task_updated_idx'),
+        ]
+
+
+class ArchivedTask(AbstractTask):
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата архивации'
+    )
+
+    def __str__(self):
+        return self.title
+
+    class Meta:
+        verbose_name = 'Архивная задача'
+        verbose_name_plural = 'Архив задач'
+
+
+class ExportJob(models.Model):
+    STATE_CHOICES = [
+        ('pending', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Готово'),
+        ('failed', 'Ошибка'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    status_filter = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='Фильтр по статусу'
+    )
+    sort = models.CharField(
+        max_length=20,
+        default='id',
+        verbose_name='Сортировка'
+    )
+    state = models.CharField(
+        max_length=20,
+        choices=STATE_CHOICES,
+        default='pending',
+        verbose_name='Состояние'
+    )
+    rows_written = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Выгружено задач'
+    )
+    bytes_written = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Размер файла'
+    )
+    last_sort_value = models.TextField(
+        blank=True,
+        verbose_name='Значение сортировки последней задачи'
+    )
+    last_task_id = models.PositiveBigIntegerField(
+        blank=True,
+        null=True,
+        verbose_name='Последняя выгруженная задача'
+    )
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+    finished_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Дата завершения'
+    )
+
+    @property
+    def file_path(self):
+        return settings.EXPORT_ROOT / f'export_{self.pk}.txt.gz'
+
+    def __str__(self):
+        return f'Экспорт #{self.pk} ({self.user})'
+
+    class Meta:
+        verbose_name = 'Фоновый экспорт'
+        verbose_name_plural = 'Фоновые экспорты'
+        indexes = [
+            models.Index(fields=['state', 'created_at']),
+            models.Index(fields=['user', 'state']),
+        ]
+
+
+class ReminderOutbox(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    task_id = models.BigIntegerField(verbose_name='Задача')
+    title = models.CharField(max_length=200, verbose_name='Название')
+    due_date = models.DateTimeField(verbose_name='Срок выполнения')
+    remind_at = models.DateTimeField(verbose_name='Время напоминания')
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания'
+    )
+
+    def __str__(self):
+        return f'{self.title} ({self.remind_at})'
+
+    class Meta:
+        verbose_name = 'Напоминание'
+        verbose_name_plural = 'Напоминания'
+        indexes = [
+            models.Index(fields=['task_id', 'due_date']),
+        ]
+
+
+class IdSequence(models.Model):
+    name = models.CharField(
+        max_length=100,
+        primary_key=True,
+        verbose_name='Таблица'
+    )
+    last_id = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Последний выданный идентификатор'
+    )
+
+    def __str__(self):
+        return f'{self.name}: {self.last_id}'
+
+    class Meta:
+        verbose_name = 'Счётчик идентификаторов'
+        verbose_name_plural = 'Счётчики идентификаторов'
+
+
+class UserShard(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='task_shard',
+        verbose_name='Пользователь'
+    )
+    alias = models.CharField(max_length=100, verbose_name='База данных')
+    moved_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата переноса'
+    )
+
+    def __str__(self):
+        return f'{self.user} -> {self.alias}'
+
+    class Meta:
+        verbose_name = 'Шард пользователя'
+        verbose_name_plural = 'Шарды пользователей'
+
+
+class CalendarFeed(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='calendar_feed',
+        verbose_name='Пользователь'
+    )
+    secret = models.CharField(max_length=32, verbose_name='Секрет ссылки')
+    reset_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата сброса ссылки'
+    )
+
+    def __str__(self):
+        return f'{self.user}: {self.reset_at}'
+
+    class Meta:
+        verbose_name = 'Лента календаря'
+        verbose_name_plural = 'Ленты календаря'
+
+
+class PendingUserPurge(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='pending_purge',
+        verbose_name='Пользователь'
+    )
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+',
+        verbose_name='Кем запрошено'
+    )
+    was_active = models.BooleanField(
+        default=True,
+        verbose_name='Был активен'
+    )
+    requested_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата запроса'
+    )
+    purge_after = models.DateTimeField(
+        db_index=True,
+        verbose_name='Удалить после'
+    )
+    started_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Начало удаления'
+    )
+
+    def __str__(self):
+        return f'{self.user} ({self.purge_after})'
+
+    class Meta:
+        verbose_name = 'Удаление пользователя'
+        verbose_name_plural = 'Удаления пользователей'
+
+
+class TaskSyncState(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        db_constraint=False,
+        related_name='task_sync_state',
+        verbose_name='Пользователь'
+    )
+    last_token = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Последний токен'
+    )
+    horizon = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Горизонт компактизации'
+    )
+
+    objects = TaskQuerySet.as_manager()
+
+    shard_user_field = 'user'
+
+    def __str__(self):
+        return f'{self.user}: {self.last_token}'
+
+    class Meta:
+        verbose_name = 'Состояние синхронизации'
+        verbose_name_plural = 'Состояния синхронизации'
+
+
+class TaskChange(models.Model):
+    OP_CHOICES = [
+        ('upsert', 'Изменение'),
+        ('delete', 'Удаление'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        verbose_name='Пользователь'
+    )
+    token = models.PositiveBigIntegerField(verbose_name='Токен')
+    task_id = models.BigIntegerField(verbose_name='Задача')
+    op = models.CharField(
+        max_length=10,
+        choices=OP_CHOICES,
+        verbose_name='Операция'
+    )
+    changed_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата изменения'
+    )
+
+    objects = TaskQuerySet.as_manager()
+
+    shard_user_field = 'user'
+
+    def __str__(self):
+        return f'{self.get_op_display()} #{self.task_id} ({self.token})'
+
+    class Meta:
+        verbose_name = 'Изменение задачи'
+        verbose_name_plural = 'Журнал изменений задач'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'token'],
+                name='task_change_user_token_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'task_id', 'token'],
+                name='task_change_compact_idx'
+            ),
+            models.Index(
+                fields=['op', 'changed_at'],
+                name='task_change_tombstone_idx'
+            ),
+        ]
+
+
+class TaskTransition(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        verbose_name='Пользователь'
+    )
+    task_id = models.BigIntegerField(verbose_name='Задача')
+    from_status = models.CharField(
+        max_length=20,
+        choices=AbstractTask.STATUS_CHOICES,
+        blank=True,
+        null=True,
+        verbose_name='Предыдущий статус'
+    )
+    to_status = models.CharField(
+        max_length=20,
+        choices=AbstractTask.STATUS_CHOICES,
+        blank=True,
+        null=True,
+        verbose_name='Новый статус'
+    )
+    changed_at = models.DateTimeField(verbose_name='Дата перехода')
+
+    objects = TaskQuerySet.as_manager()
+
+    shard_user_field = 'user'
+
+    def __str__(self):
+        return f'#{self.task_id}: {self.from_status} -> {self.to_status}'
+
+    class Meta:
+        verbose_name = 'Переход статуса'
+        verbose_name_plural = 'История статусов'
+        indexes = [
+            models.Index(
+                fields=['user', 'changed_at'],
+                name='task_transition_range_idx'
+            ),
+            models.Index(
+                fields=['user', 'task_id', 'changed_at'],
+                name='task_transition_task_idx'
+            ),
+        ]
+
+
+class TaskLshBucket(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        verbose_name='Пользователь'
+    )
+    task_id = models.BigIntegerField(verbose_name='Задача')
+    bucket = models.BigIntegerField(verbose_name='Корзина LSH')
+
+    objects = TaskQuerySet.as_manager()
+
+    shard_user_field = 'user'
+
+    def __str__(self):
+        return f'#{self.task_id}: {self.bucket}'
+
+    class Meta:
+        verbose_name = 'Корзина поиска дубликатов'
+        verbose_name_plural = 'Индекс поиска дубликатов'
+        indexes = [
+            models.Index(
+                fields=['user', 'bucket'],
+                name='task_lsh_bucket_idx'
+            ),
+            models.Index(fields=['task_id'], name='task_lsh_task_idx'),
+        ]
+
+
+class PriorityRule(models.Model):
+    phrase = models.CharField(
+        max_length=200,
+        verbose_name='Слово или фраза'
+    )
+    lemmas = models.CharField(
+        max_length=200,
+        editable=False,
+        verbose_name='Леммы'
+    )
+    weight = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Вес'
+    )
+    is_ignored = models.BooleanField(
+        default=False,
+        verbose_name='Игнорировать',
+        help_text='Фраза не влияет на приоритет, даже если задана общим правилом'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='priority_rules',
+        verbose_name='Пользователь',
+        help_text='Пусто — правило действует для всех пользователей'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+
+    def clean(self):
+        self.lemmas = ' '.join(Task.title_lemmas(self.phrase or ''))
+        if not self.lemmas:
+            raise ValidationError(
+                {'phrase': 'Фраза должна содержать слова на русском языке'}
+            )
+        duplicates = PriorityRule.objects.filter(
+            lemmas=self.lemmas,
+            user=self.user
+        ).exclude(pk=self.pk)
+        if duplicates.exists():
+            raise ValidationError(
+                {'phrase': 'Правило для этой фразы уже существует'}
+            )
+
+    def save(self, *args, **kwargs):
+        self.lemmas = ' '.join(Task.title_lemmas(self.phrase or ''))
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.phrase
+
+    class Meta:
+        verbose_name = 'Правило приоритета'
+        verbose_name_plural = 'Правила приоритета'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['lemmas'],
+                condition=models.Q(user__isnull=True),
+                name='priority_rule_global_uniq'
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'lemmas'],
+                condition=models.Q(user__isnull=False),
+                name='priority_rule_user_uniq'
+            ),
+        ]
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import models
+
+from .models import PriorityRule
+
+
+class PhraseMatcher:
+    # Автомат Ахо — Корасик над последовательностями лемм: за один проход
+    # по названию находит все фразы правил, включая пересекающиеся.
+    def __init__(self, phrases):
+        self.transitions = [{}]
+        self.fail = [0]
+        self.output = [()]
+        for phrase in phrases:
+            state = 0
+            for lemma in phrase:
+                if lemma not in self.transitions[state]:
+                    self.transitions[state][lemma] = len(self.transitions)
+                    self.transitions.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                state = self.transitions[state][lemma]
+            self.output[state] += (phrase,)
+
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for lemma, target in self.transitions[state].items():
+                queue.append(target)
+                fallback = self.fail[state]
+                while fallback and lemma not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[target] = self.transitions[fallback].get(lemma, 0)
+                self.output[target] += self.output[self.fail[target]]
+
+    def match(self, lemmas):
+        matched = set()
+        state = 0
+        for lemma in lemmas:
+            while state and lemma not in self.transitions[state]:
+                state = self.fail[state]
+            state = self.transitions[state].get(lemma, 0)
+            matched.update(self.output[state])
+        return matched
+
+
+class PriorityRules:
+    def __init__(self, version, rules):
+        self.version = version
+        self.weights = {}
+        self.user_weights = defaultdict(dict)
+        for user_id, lemmas, weight, is_ignored in rules:
+            phrase = tuple(lemmas.split())
+            weights = self.weights if user_id is None else (
+                self.user_weights[user_id]
+            )
+            weights[phrase] = 0 if is_ignored else weight
+        self.matcher = PhraseMatcher(
+            set(self.weights).union(*self.user_weights.values())
+        )
+
+    def weight(self, lemmas, user_id=None):
+        overrides = self.user_weights.get(user_id, {})
+        total = 0
+        for phrase in self.matcher.match(lemmas):
+            total += overrides.get(phrase, self.weights.get(phrase, 0))
+        return total
+
+    def has_overrides(self, user_id):
+        return user_id in self.user_weights
+
+
+_rules = None
+_checked_at = float('-inf')
+_lock = threading.Lock()
+
+
+def rules_version():
+    version = PriorityRule.objects.aggregate(
+        count=models.Count('pk'),
+        updated_at=models.Max('updated_at')
+    )
+    return version['count'], version['updated_at']
+
+
+def load_rules(version):
+    return PriorityRules(
+        version,
+        PriorityRule.objects.values_list(
+            'user_id', 'lemmas', 'weight', 'is_ignored'
+        ).iterator()
+    )
+
+
+def current_rules():
+    global _rules, _checked_at
+    if (_rules is not None and time.monotonic() - _checked_at
+            < settings.PRIORITY_RULES_CHECK_SECONDS):
+        return _rules
+    with _lock:
+        if (_rules is None or time.monotonic() - _checked_at
+                >= settings.PRIORITY_RULES_CHECK_SECONDS):
+            version = rules_version()
+            if _rules is None or _rules.version != version:
+                _rules = load_rules(version)
+            _checked_at = time.monotonic()
+    return _rules
+
+
+def expire_rules():
+    global _checked_at
+    _checked_at = float('-inf')
@@ -0,0 +1,163 @@
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import models, transaction
+from django.utils import timezone
+
+from .board import invalidate_boards, tasks_removed
+from .duplicates import unindex_tasks
+from .history import record_transitions
+from .models import ExportJob, PendingUserPurge, Task
+from .reminders import get_scheduler
+from .sharding import delete_by_pk, shard_for_user, sharded_models, user_rows
+from .sync import record_changes
+
+
+def task_restore_deadline(now=None):
+    return (now or timezone.now()) - timezone.timedelta(
+        seconds=settings.TASK_DELETE_GRACE_SECONDS
+    )
+
+
+def soft_delete_tasks(user, pks):
+    tasks = Task.objects.for_user(user)
+    now = timezone.now()
+    with transaction.atomic(using=tasks.db):
+        rows = list(
+            tasks.filter(pk__in=pks).select_for_update()
+            .values_list('pk', 'status')
+        )
+        deleted = [pk for pk, status in rows]
+        if not deleted:
+            return []
+        tasks.filter(pk__in=deleted).update(deleted_at=now, updated_at=now)
+        record_transitions(user.pk, rows, None, now, tasks.db)
+        record_changes(user.pk, deleted, 'delete', using=tasks.db)
+        tasks_removed(user.pk, deleted, tasks.db)
+    scheduler = get_scheduler()
+    if scheduler is not None:
+        for pk in deleted:
+            scheduler.task_deleted(pk)
+    return deleted
+
+
+def restore_tasks(user, pks):
+    tasks = Task.all_objects.for_user(user)
+    now = timezone.now()
+    with transaction.atomic(using=tasks.db):
+        rows = list(
+            tasks.filter(
+                pk__in=pks,
+                deleted_at__gte=task_restore_deadline(now)
+            ).select_for_update().values_list('pk', 'status', 'due_date')
+        )
+        restored = [pk for pk, status, due_date in rows]
+        if not restored:
+            return []
+        tasks.filter(pk__in=restored).update(deleted_at=None, updated_at=now)
+        by_status = defaultdict(list)
+        for pk, status, due_date in rows:
+            by_status[status].append((pk, None))
+        for status, status_rows in by_status.items():
+            record_transitions(user.pk, status_rows, status, now, tasks.db)
+        record_changes(user.pk, restored, 'upsert', using=tasks.db)
+        invalidate_boards([user.pk], tasks.db)
+    scheduler = get_scheduler()
+    if scheduler is not None:
+        for pk, status, due_date in rows:
+            scheduler.task_changed(pk, due_date, status)
+    return restored
+
+
+def purge_deleted_tasks(batch_size, pause=0, on_batch=None):
+    older_than = task_restore_deadline()
+    total = 0
+    for alias in settings.TASK_SHARDS:
+        candidates = Task.all_objects.using(alias).filter(
+            deleted_at__lt=older_than
+        ).order_by('deleted_at')
+        while True:
+            pks = list(candidates.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            with transaction.atomic(using=alias):
+                unindex_tasks(pks, alias)
+                total += delete_by_pk(Task, alias, pks)
+            if on_batch:
+                on_batch(total)
+            time.sleep(pause)
+    return total
+
+
+def schedule_user_purge(user, requested_by=None):
+    with transaction.atomic():
+        purge, created = PendingUserPurge.objects.get_or_create(
+            user=user,
+            defaults={
+                'requested_by': requested_by,
+                'was_active': user.is_active,
+                'purge_after': timezone.now() + timezone.timedelta(
+                    seconds=settings.USER_DELETE_GRACE_SECONDS
+                ),
+            }
+        )
+        if user.is_active:
+            user.is_active = False
+            user.save(update_fields=['is_active'])
+    return purge
+
+
+def cancel_user_purge(purge):
+    with transaction.atomic():
+        cancelled = PendingUserPurge.objects.filter(
+            pk=purge.pk,
+            started_at__isnull=True
+        ).delete()[0]
+        if cancelled and purge.was_active:
+            purge.user.is_active = True
+            purge.user.save(update_fields=['is_active'])
+    return bool(cancelled)
+
+
+def claim_user_purge():
+    now = timezone.now()
+    stale = now - timezone.timedelta(seconds=settings.USER_PURGE_STALE_SECONDS)
+    candidates = PendingUserPurge.objects.filter(
+        models.Q(started_at__isnull=True) | models.Q(started_at__lt=stale),
+        purge_after__lte=now
+    ).order_by('purge_after')
+    for purge in candidates[:10]:
+        claimed = PendingUserPurge.objects.filter(
+            pk=purge.pk,
+            started_at=purge.started_at
+        ).update(started_at=now)
+        if claimed:
+            purge.started_at = now
+            return purge
+    return None
+
+
+def purge_user(purge, batch_size, pause=0, on_batch=None):
+    alias = shard_for_user(purge.user_id)
+    deleted = 0
+    for model in sharded_models():
+        rows = user_rows(model, purge.user_id, alias)
+        while True:
+            pks = list(rows.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            deleted += delete_by_pk(model, alias, pks)
+            PendingUserPurge.objects.filter(pk=purge.pk).update(
+                started_at=timezone.now()
+            )
+            if on_batch:
+                on_batch(deleted)
+            time.sleep(pause)
+    for job in ExportJob.objects.filter(user_id=purge.user_id):
+        job.file_path.unlink(missing_ok=True)
+    user = User.objects.filter(pk=purge.user_id).first()
+    if user is not None:
+        user.delete()
+    return deleted
@@ -0,0 +1,258 @@
+import datetime
+import json
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import ReminderOutbox, Task
+
+
+class TimingWheel:
+    def __init__(self, start, bits=6, levels=4):
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.levels = levels
+        self.current = int(start)
+        self.wheels = [
+            [{} for _ in range(1 << bits)] for _ in range(levels)
+        ]
+        self.counts = [0] * levels
+        self.positions = {}
+        self.overflow = {}
+        self.ready = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def schedule(self, key, when):
+        self.cancel(key)
+        self._place(key, int(when))
+
+    def cancel(self, key):
+        position = self.positions.pop(key, None)
+        if position is None:
+            return False
+        level, slot = position
+        if level == 'ready':
+            del self.ready[key]
+        elif level == 'overflow':
+            del self.overflow[key]
+        else:
+            del self.wheels[level][slot][key]
+            self.counts[level] -= 1
+        return True
+
+    def advance(self, until):
+        until = int(until)
+        expired = self._drain_ready()
+
+        while self.current < until:
+            if not self.positions:
+                self.current = until
+                break
+            self._skip_empty_levels(until)
+            self.current += 1
+            self._cascade()
+            expired.extend(self._drain_ready())
+            bucket = self.wheels[0][self.current & self.mask]
+            if bucket:
+                self.wheels[0][self.current & self.mask] = {}
+                self.counts[0] -= len(bucket)
+                for key, when in bucket.items():
+                    del self.positions[key]
+                    expired.append((key, when))
+        return expired
+
+    def _skip_empty_levels(self, until):
+        level = 0
+        while level < self.levels and not self.counts[level]:
+            level += 1
+        if level:
+            shift = self.bits * level
+            boundary = ((self.current >> shift) + 1) << shift
+            self.current = min(until, boundary) - 1
+
+    def _drain_ready(self):
+        expired = list(self.ready.items())
+        for key, _ in expired:
+            del self.positions[key]
+        self.ready = {}
+        return expired
+
+    def _cascade(self):
+        crossed = []
+        for level in range(1, self.levels + 1):
+            if self.current & ((1 << (self.bits * level)) - 1):
+                break
+            crossed.append(level)
+        for level in reversed(crossed):
+            if level == self.levels:
+                bucket, self.overflow = self.overflow, {}
+            else:
+                slot = (self.current >> (self.bits * level)) & self.mask
+                bucket = self.wheels[level][slot]
+                self.wheels[level][slot] = {}
+                self.counts[level] -= len(bucket)
+            for key, when in bucket.items():
+                del self.positions[key]
+                self._place(key, when)
+
+    def _place(self, key, when):
+        if when <= self.current:
+            self.ready[key] = when
+            self.positions[key] = ('ready', None)
+            return
+        for level in range(self.levels):
+            shift = self.bits * (level + 1)
+            if when >> shift == self.current >> shift:
+                slot = (when >> (self.bits * level)) & self.mask
+                self.wheels[level][slot][key] = when
+                self.counts[level] += 1
+                self.positions[key] = (level, slot)
+                return
+        self.overflow[key] = when
+        self.positions[key] = ('overflow', None)
+
+
+class DatabaseOutbox:
+    def delivered(self, reminders):
+        task_ids = [reminder['task_id'] for reminder in reminders]
+        return set(
+            ReminderOutbox.objects.filter(task_id__in=task_ids)
+            .values_list('task_id', 'due_date')
+        )
+
+    def deliver(self, reminders):
+        ReminderOutbox.objects.bulk_create([
+            ReminderOutbox(**reminder) for reminder in reminders
+        ])
+
+
+class FileOutbox:
+    def delivered(self, reminders):
+        return set()
+
+    def deliver(self, reminders):
+        path = settings.REMINDER_FILE_OUTBOX_PATH
+        with open(path, 'a', encoding='utf-8') as file:
+            for reminder in reminders:
+                file.write(
+                    json.dumps(reminder, default=str, ensure_ascii=False)
+                )
+                file.write('\n')
+
+
+class ReminderScheduler:
+    def __init__(self, now=None, outbox=None):
+        now = now or timezone.now()
+        self.lead = timezone.timedelta(minutes=settings.REMINDER_LEAD_MINUTES)
+        self.window = timezone.timedelta(hours=settings.REMINDER_WINDOW_HOURS)
+        self.batch_size = settings.REMINDER_BATCH_SIZE
+        self.outbox = outbox or import_string(settings.REMINDER_OUTBOX)()
+        self.wheel = TimingWheel(now.timestamp())
+        self.loaded_until = now
+        self.changes_cursor = dict.fromkeys(settings.TASK_SHARDS, now)
+
+    def remind_at(self, due_date):
+        return int((due_date - self.lead).timestamp())
+
+    def load_window(self, now=None):
+        now = now or timezone.now()
+        load_until = now + self.lead + self.window
+        if load_until <= self.loaded_until:
+            return 0
+        loaded = 0
+        for alias in settings.TASK_SHARDS:
+            tasks = Task.objects.using(alias).filter(
+                due_date__gte=self.loaded_until,
+                due_date__lt=load_until
+            ).exclude(status='done').values_list('pk', 'due_date')
+            for pk, due_date in tasks.iterator(chunk_size=self.batch_size):
+                self.wheel.schedule(pk, self.remind_at(due_date))
+                loaded += 1
+        self.loaded_until = load_until
+        return loaded
+
+    def task_changed(self, pk, due_date, status):
+        if status == 'done' or due_date >= self.loaded_until:
+            self.wheel.cancel(pk)
+        elif due_date > timezone.now():
+            self.wheel.schedule(pk, self.remind_at(due_date))
+        else:
+            self.wheel.cancel(pk)
+
+    def task_deleted(self, pk):
+        self.wheel.cancel(pk)
+
+    def poll_changes(self):
+        for alias in settings.TASK_SHARDS:
+            changes = Task.objects.using(alias).filter(
+                updated_at__gt=self.changes_cursor[alias]
+            ).order_by('updated_at').values_list(
+                'pk', 'due_date', 'status', 'updated_at'
+            )
+            for pk, due_date, status, updated_at in changes.iterator(
+                    chunk_size=self.batch_size):
+                self.task_changed(pk, due_date, status)
+                self.changes_cursor[alias] = updated_at
+
+    def tick(self, now=None):
+        now = now or timezone.now()
+        expired = self.wheel.advance(now.timestamp())
+        delivered = 0
+        for start in range(0, len(expired), self.batch_size):
+            delivered += self.deliver(
+                dict(expired[start:start + self.batch_size])
+            )
+        return delivered
+
+    def deliver(self, fired):
+        tasks = []
+        for alias in settings.TASK_SHARDS:
+            tasks.extend(
+                Task.objects.using(alias).filter(
+                    pk__in=list(fired)
+                ).exclude(status='done').values_list(
+                    'pk', 'user_id', 'title', 'due_date'
+                )
+            )
+        reminders = [
+            {
+                'user_id': user_id,
+                'task_id': pk,
+                'title': title,
+                'due_date': due_date,
+                'remind_at': datetime.datetime.fromtimestamp(
+                    fired[pk], tz=datetime.timezone.utc
+                ),
+            }
+            for pk, user_id, title, due_date in tasks
+            if self.remind_at(due_date) == fired[pk]
+        ]
+        if not reminders:
+            return 0
+        already_delivered = self.outbox.delivered(reminders)
+        reminders = [
+            reminder for reminder in reminders
+            if (reminder['task_id'], reminder['due_date'])
+            not in already_delivered
+        ]
+        if reminders:
+            self.outbox.deliver(reminders)
+        return len(reminders)
+
+
+scheduler = None
+
+
+def get_scheduler():
+    return scheduler
+
+
+def set_scheduler(instance):
+    global scheduler
+    scheduler = instance
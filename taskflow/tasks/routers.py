@@ -0,0 +1,41 @@
+from django.apps import apps
+from django.conf import settings
+
+
+class TaskShardRouter:
+    def route(self, model, **hints):
+        if not getattr(model, 'shard_user_field', None):
+            return 'default'
+        instance = hints.get('instance')
+        if isinstance(instance, model):
+            if instance._state.db:
+                return instance._state.db
+            from .sharding import instance_user_id, shard_for_user
+
+            user_id = instance_user_id(instance)
+            if user_id is not None:
+                return shard_for_user(user_id)
+        elif instance is not None and instance._meta.model_name == 'user':
+            from .sharding import shard_for_user
+
+            return shard_for_user(instance.pk)
+        return None
+
+    db_for_read = route
+    db_for_write = route
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == 'default':
+            return True
+        if db not in settings.TASK_SHARDS or app_label != 'tasks':
+            return False
+        if model_name is None:
+            return True
+        try:
+            model = apps.get_model(app_label, model_name)
+        except LookupError:
+            return False
+        return bool(getattr(model, 'shard_user_field', None))
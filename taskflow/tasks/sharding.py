@@ -0,0 +1,152 @@
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connections, models, transaction
+
+from .models import ArchivedTask, IdSequence, Task, UserShard
+
+_task_ids = iter(())
+_task_ids_lock = threading.Lock()
+
+
+def shard_cache_key(user_id):
+    return f'task-shard:{user_id}'
+
+
+def default_shard(user_id):
+    shards = settings.TASK_SHARDS
+    return shards[zlib.crc32(str(user_id).encode()) % len(shards)]
+
+
+def shard_for_user(user_id):
+    if len(settings.TASK_SHARDS) == 1:
+        return settings.TASK_SHARDS[0]
+    key = shard_cache_key(user_id)
+    alias = cache.get(key)
+    if alias is None:
+        alias = UserShard.objects.filter(user_id=user_id).values_list(
+            'alias', flat=True
+        ).first() or default_shard(user_id)
+        cache.set(key, alias, settings.TASK_SHARD_CACHE_SECONDS)
+    return alias
+
+
+def sharded_models():
+    return [
+        model for model in apps.get_app_config('tasks').get_models()
+        if getattr(model, 'shard_user_field', None)
+    ]
+
+
+def instance_user_id(instance):
+    return getattr(instance, f'{instance.shard_user_field}_id', None)
+
+
+def allocate_task_ids(count):
+    # Идентификаторы задач выдаются общим счётчиком в default, а не
+    # автоинкрементом шарда: перенесённые между шардами задачи сохраняют
+    # свои идентификаторы, и новые задачи с ними не пересекаются.
+    if not count:
+        return range(0)
+    sequences = IdSequence.objects.filter(name=Task._meta.db_table)
+    with transaction.atomic(using='default'):
+        if not sequences.update(last_id=models.F('last_id') + count):
+            try:
+                with transaction.atomic(using='default'):
+                    IdSequence.objects.create(
+                        name=Task._meta.db_table,
+                        last_id=max_task_id() + count
+                    )
+            except IntegrityError:
+                sequences.update(last_id=models.F('last_id') + count)
+        last_id = sequences.values_list('last_id', flat=True).get()
+    return range(last_id - count + 1, last_id + 1)
+
+
+def max_task_id():
+    return max(
+        model._base_manager.using(alias).aggregate(
+            last=models.Max('pk')
+        )['last'] or 0
+        for model in (Task, ArchivedTask)
+        for alias in settings.TASK_SHARDS
+    )
+
+
+def next_task_id():
+    global _task_ids
+    with _task_ids_lock:
+        pk = next(_task_ids, None)
+        if pk is None:
+            _task_ids = iter(allocate_task_ids(settings.TASK_ID_BLOCK_SIZE))
+            pk = next(_task_ids)
+    return pk
+
+
+def user_rows(model, user_id, alias):
+    return model._base_manager.using(alias).filter(
+        **{f'{model.shard_user_field}_id': user_id}
+    ).order_by('pk')
+
+
+def delete_by_pk(model, alias, pks):
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+    with transaction.atomic(using=alias):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM {} WHERE {} IN ({})'.format(
+                    quote(model._meta.db_table),
+                    quote(model._meta.pk.column),
+                    ', '.join(['%s'] * len(pks))
+                ),
+                pks
+            )
+            return cursor.rowcount
+
+
+def scatter_gather(func):
+    def run(alias):
+        try:
+            return func(alias)
+        finally:
+            connections[alias].close()
+
+    shards = settings.TASK_SHARDS
+    if len(shards) == 1:
+        return [func(shards[0])]
+    with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+        return list(pool.map(run, shards))
+
+
+def global_status_counts():
+    from .models import Task
+
+    def shard_counts(alias):
+        return dict(
+            Task.objects.using(alias).values_list('status')
+            .annotate(count=models.Count('id'))
+            .values_list('status', 'count')
+        )
+
+    results = scatter_gather(shard_counts)
+    totals = {status: 0 for status, _ in Task.STATUS_CHOICES}
+    for counts in results:
+        for status, count in counts.items():
+            totals[status] = totals.get(status, 0) + count
+    labels = dict(Task.STATUS_CHOICES)
+    return {
+        'shards': {
+            alias: sum(counts.values())
+            for alias, counts in zip(settings.TASK_SHARDS, results)
+        },
+        'statuses': [
+            (labels.get(status, status), count)
+            for status, count in totals.items()
+        ],
+        'total': sum(totals.values()),
+    }
@@ -0,0 +1,103 @@
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .auth import invalidate_cached_user
+from .board import task_saved, tasks_removed
+from .duplicates import index_task, unindex_tasks
+from .history import record_transitions
+from .models import PriorityRule, Task
+from .priority_rules import expire_rules
+from .reminders import get_scheduler
+from .sharding import shard_for_user, sharded_models, user_rows
+from .sync import record_changes
+
+
+@receiver(post_save, sender=Task)
+def reschedule_reminder(sender, instance, **kwargs):
+    scheduler = get_scheduler()
+    if scheduler is not None:
+        scheduler.task_changed(instance.pk, instance.due_date, instance.status)
+
+
+@receiver(post_delete, sender=Task)
+def cancel_reminder(sender, instance, **kwargs):
+    scheduler = get_scheduler()
+    if scheduler is not None:
+        scheduler.task_deleted(instance.pk)
+
+
+@receiver(post_save, sender=Task)
+def patch_task_board(sender, instance, using, **kwargs):
+    task_saved(instance, using)
+
+
+@receiver(post_delete, sender=Task)
+def remove_from_task_board(sender, instance, using, **kwargs):
+    tasks_removed(instance.user_id, [instance.pk], using)
+
+
+@receiver(post_save, sender=Task)
+def log_task_upsert(sender, instance, using, **kwargs):
+    record_changes(instance.user_id, [instance.pk], 'upsert', using=using)
+
+
+@receiver(post_save, sender=Task)
+def index_task_title(sender, instance, created, using, **kwargs):
+    if created or instance.title_changed():
+        index_task(instance, using)
+
+
+@receiver(post_delete, sender=Task)
+def unindex_task_title(sender, instance, using, origin=None, **kwargs):
+    if not isinstance(origin, User):
+        unindex_tasks([instance.pk], using)
+
+
+@receiver(post_delete, sender=Task)
+def log_task_delete(sender, instance, using, origin=None, **kwargs):
+    if isinstance(origin, User):
+        return
+    record_changes(instance.user_id, [instance.pk], 'delete', using=using)
+    record_transitions(
+        instance.user_id,
+        [(instance.pk, instance.status)],
+        None,
+        timezone.now(),
+        using
+    )
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_tasks(sender, instance, using, **kwargs):
+    # Каскад удаляет строки только в базе пользователя; на остальных шардах
+    # строки удаляются вместе с мягко удалёнными задачами.
+    alias = shard_for_user(instance.pk)
+    if alias != using:
+        for model in sharded_models():
+            user_rows(model, instance.pk, alias).delete()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_user_permissions(sender, instance, **kwargs):
+    if isinstance(instance, User):
+        invalidate_cached_user(instance.pk)
+    else:
+        invalidate_cached_user()
+
+
+@receiver(post_save, sender=PriorityRule)
+@receiver(post_delete, sender=PriorityRule)
+def reload_priority_rules(sender, using, **kwargs):
+    transaction.on_commit(expire_rules, using=using)
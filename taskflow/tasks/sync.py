@@ -0,0 +1,140 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from .models import Task, TaskChange, TaskSyncState
+
+SYNC_FIELDS = [
+    'id', 'title', 'description', 'due_date', 'status', 'priority',
+    'original_status', 'created_at', 'updated_at'
+]
+
+
+def record_changes(user_id, task_ids, op='upsert', using=None):
+    task_ids = list(dict.fromkeys(task_ids))
+    if not task_ids:
+        return 0
+    states = TaskSyncState.objects.for_user(user_id)
+    if using:
+        states = states.using(using)
+    advance = {'last_token': models.F('last_token') + len(task_ids)}
+    with transaction.atomic(using=states.db):
+        if not states.update(**advance):
+            states.get_or_create(user_id=user_id)
+            states.update(**advance)
+        last_token = states.values_list('last_token', flat=True).get()
+        first_token = last_token - len(task_ids) + 1
+        TaskChange.objects.using(states.db).bulk_create(
+            [
+                TaskChange(
+                    user_id=user_id,
+                    token=first_token + offset,
+                    task_id=task_id,
+                    op=op
+                )
+                for offset, task_id in enumerate(task_ids)
+            ],
+            batch_size=settings.TASK_SYNC_BATCH_SIZE
+        )
+    return len(task_ids)
+
+
+def record_queryset_changes(queryset, op='upsert'):
+    task_ids = defaultdict(list)
+    rows = queryset.order_by().values_list('pk', 'user_id')
+    for pk, user_id in rows.iterator(chunk_size=settings.TASK_SYNC_BATCH_SIZE):
+        task_ids[user_id].append(pk)
+    for user_id, pks in task_ids.items():
+        record_changes(user_id, pks, op, using=queryset.db)
+    return sum(len(pks) for pks in task_ids.values())
+
+
+def sync_state(user):
+    return TaskSyncState.objects.for_user(user).values(
+        'last_token', 'horizon'
+    ).first() or {'last_token': 0, 'horizon': 0}
+
+
+def changes_since(user, since, limit):
+    state = sync_state(user)
+    if since > state['last_token'] or 0 < since < state['horizon']:
+        return {'reset': True, 'token': 0, 'has_more': True,
+                'upserts': [], 'deletes': []}
+
+    changes = list(
+        TaskChange.objects.for_user(user).filter(token__gt=since)
+        .order_by('token')
+        .values_list('token', 'task_id', 'op')[:limit + 1]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    latest = {}
+    for token, task_id, op in changes:
+        latest[task_id] = op
+    tasks = Task.objects.for_user(user).filter(
+        pk__in=[task_id for task_id, op in latest.items() if op == 'upsert']
+    ).values(*SYNC_FIELDS)
+    upserts = {task['id']: task for task in tasks}
+    deletes = [task_id for task_id in latest if task_id not in upserts]
+
+    return {
+        'reset': False,
+        'token': changes[-1][0] if changes else since,
+        'has_more': has_more,
+        'upserts': list(upserts.values()),
+        'deletes': deletes,
+    }
+
+
+def superseded_changes(alias):
+    newer = TaskChange.objects.using(alias).filter(
+        user_id=models.OuterRef('user_id'),
+        task_id=models.OuterRef('task_id'),
+        token__gt=models.OuterRef('token')
+    )
+    return TaskChange.objects.using(alias).filter(models.Exists(newer))
+
+
+def compact_shard(alias, older_than, batch_size):
+    removed = 0
+    superseded = superseded_changes(alias)
+    while True:
+        pks = list(superseded.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        removed += TaskChange.objects.using(alias).filter(pk__in=pks).delete()[0]
+
+    tombstones = TaskChange.objects.using(alias).filter(
+        op='delete',
+        changed_at__lt=older_than
+    ).order_by('pk')
+    while True:
+        with transaction.atomic(using=alias):
+            rows = list(
+                tombstones.values_list('pk', 'user_id', 'token')[:batch_size]
+            )
+            if not rows:
+                break
+            horizons = {}
+            for pk, user_id, token in rows:
+                horizons[user_id] = max(horizons.get(user_id, 0), token)
+            for user_id, token in horizons.items():
+                TaskSyncState.objects.using(alias).filter(
+                    user_id=user_id,
+                    horizon__lt=token
+                ).update(horizon=token)
+            removed += TaskChange.objects.using(alias).filter(
+                pk__in=[row[0] for row in rows]
+            ).delete()[0]
+    return removed
+
+
+def compact_changes(days, batch_size):
+    older_than = timezone.now() - timezone.timedelta(days=days)
+    return {
+        alias: compact_shard(alias, older_than, batch_size)
+        for alias in settings.TASK_SHARDS
+    }
@@ -0,0 +1,36 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.cache import cache
+
+register = template.Library()
+
+
+def cached_date_hierarchy(cl):
+    query_string = cl.get_query_string(remove=[PAGE_VAR])
+    key = 'admin-date-hierarchy:{}:{}'.format(
+        cl.opts.label_lower,
+        hashlib.md5(query_string.encode()).hexdigest()
+    )
+    result = cache.get(key)
+    if result is None:
+        result = date_hierarchy(cl)
+        if result:
+            result['choices'] = list(result['choices'])
+        cache.set(key, result, settings.ADMIN_DATE_HIERARCHY_CACHE_SECONDS)
+    return result
+
+
+@register.tag(name='cached_date_hierarchy')
+def cached_date_hierarchy_tag(parser, token):
+    return InclusionAdminNode(
+        parser,
+        token,
+        func=cached_date_hierarchy,
+        template_name='date_hierarchy.html',
+        takes_context=False,
+    )
@@ -0,0 +1,17 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def duration(seconds):
+    if seconds is None:
+        return '—'
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f'{minutes} мин'
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f'{hours} ч {minutes} мин'
+    days, hours = divmod(hours, 24)
+    return f'{days} д {hours} ч'
@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .archive import archive_batch
+from .models import ExportJob, Task
+from .sharding import shard_for_user
+
+
+class EstimatedCountPaginatorTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'p')
+        self.client.force_login(admin)
+        self.shard = shard_for_user(admin.pk)
+        Task.objects.for_user(admin).create(
+            user=admin,
+            title='Задача',
+            due_date=timezone.now()
+        )
+
+    @mock.patch('tasks.admin.estimate_row_count', return_value=10 ** 6)
+    def test_unfiltered_changelist_uses_estimate(self, estimate):
+        response = self.client.get(
+            reverse('admin:tasks_task_changelist'), {'shard': self.shard}
+        )
+        self.assertEqual(response.context['cl'].result_count, 10 ** 6)
+        estimate.assert_called_once()
+
+    @mock.patch('tasks.admin.estimate_row_count', return_value=10 ** 6)
+    def test_filtered_changelist_counts_rows(self, estimate):
+        response = self.client.get(
+            reverse('admin:tasks_task_changelist'),
+            {'status': 'todo', 'shard': self.shard}
+        )
+        self.assertEqual(response.context['cl'].result_count, 1)
+        estimate.assert_not_called()
+
+
+class ExportJobCreateTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        user = User.objects.create_user('user', password='p')
+        self.client.force_login(user)
+
+    def test_unknown_sort_is_rejected(self):
+        response = self.client.post(
+            reverse('export_job_create'), {'sort': 'user__password'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ExportJob.objects.exists())
+
+    def test_known_sort_is_accepted(self):
+        response = self.client.post(
+            reverse('export_job_create'), {'sort': '-due_date'}
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(ExportJob.objects.get().sort, '-due_date')
+
+
+class TaskDetailTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user('user', password='p')
+        self.client.force_login(self.user)
+        self.task = Task.objects.for_user(self.user).create(
+            user=self.user,
+            title='Задача',
+            status='done',
+            due_date=timezone.now()
+        )
+
+    def test_active_task_has_edit_and_delete_links(self):
+        response = self.client.get(reverse('task_detail', args=[self.task.pk]))
+        self.assertContains(response, reverse('task_update', args=[self.task.pk]))
+        self.assertContains(response, reverse('task_delete', args=[self.task.pk]))
+
+    def test_archived_task_has_no_edit_and_delete_links(self):
+        Task.objects.for_user(self.user).filter(pk=self.task.pk).update(
+            updated_at=timezone.now() - timezone.timedelta(days=365)
+        )
+        archive_batch(timezone.now(), 100, shard_for_user(self.user.pk))
+        response = self.client.get(reverse('task_detail', args=[self.task.pk]))
+        self.assertContains(response, 'В архиве')
+        self.assertNotContains(response, reverse('task_update', args=[self.task.pk]))
+        self.assertNotContains(response, reverse('task_delete', args=[self.task.pk]))
@@ -9,10 +9,18 @@ urlpatterns = [
     path('task/create/', views.task_create, name='task_create'),
     path('task/<int:pk>/update/', views.task_update, name='task_update'),
     path('task/<int:pk>/delete/', views.task_delete, name='task_delete'),
+    path('tasks/delete/', views.tasks_bulk_delete, name='tasks_bulk_delete'),
+    path('tasks/restore/', views.tasks_restore, name='tasks_restore'),
     path('task/<int:pk>/update-status/', views.update_task_status, name='update_task_status'),
     path('analytics/', views.analytics, name='analytics'),
     path('auth/', views.auth_view, name='auth'),
     path('logout/', views.user_logout, name='logout'),
     path('api/tasks-stats/', views.tasks_stats_api, name='tasks_stats_api'),
+    path('api/sync/', views.sync_tasks, name='sync_tasks'),
     path('export/', views.export_tasks, name='export_tasks'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
+    path('calendar/reset/', views.calendar_feed_reset, name='calendar_feed_reset'),
+    path('export/jobs/', views.export_job_create, name='export_job_create'),
+    path('export/jobs/<int:pk>/', views.export_job_status, name='export_job_status'),
+    path('export/jobs/<int:pk>/download/', views.export_job_download, name='export_job_download'),
 ]
@@ -2,62 +2,136 @@ import datetime
 import io
 import json
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm
 from django.core.paginator import Paginator
-from django.db import models
-from django.http import HttpResponse, JsonResponse
+from django.db import models, transaction
+from django.http import (FileResponse, Http404, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.views.decorators.http import require_GET, require_POST
 
+from .archive import tasks_with_archive
+from .board import (board_columns, get_board, overdue_candidates,
+                    tasks_marked_overdue)
+from .calendar import (calendar_stream, feed_token, feed_version,
+                       reset_feed_token, user_id_from_token)
+from .exports import (SORT_MAPPING, export_filename, export_header,
+                      export_queryset, export_task)
+from .duplicates import find_duplicates, merge_into
 from .forms import RegistrationForm, TaskForm
-from .models import Task
+from .history import flow_metrics, record_transitions
+from .models import ArchivedTask, ExportJob, Task
+from .purge import restore_tasks, soft_delete_tasks, task_restore_deadline
+from .sync import changes_since, record_changes
 
 
 @login_required
 def dashboard(request):
     now = timezone.now()
 
-    Task.objects.filter(
-        user=request.user,
-        due_date__lt=now,
-        status__in=['todo', 'in_progress'],
-        original_status__isnull=True
-    ).update(
-        status='overdue',
-        original_status=models.F('status')
-    )
-
-    tasks = Task.objects.filter(user=request.user)
-    overdue_tasks = tasks.filter(status='overdue').order_by('due_date', '-priority')
-    todo_tasks = tasks.filter(status='todo').order_by('due_date', '-priority')
-    in_progress_tasks = tasks.filter(status='in_progress').order_by('due_date', '-priority')
-    done_tasks = tasks.filter(status='done').order_by('due_date', '-priority')
+    board = get_board(request.user)
+    if overdue_candidates(board, now):
+        tasks = Task.objects.for_user(request.user)
+        with transaction.atomic(using=tasks.db):
+            # Транзакция начинается с записи: в SQLite чтение с последующей
+            # записью при параллельном запросе сразу получает «database is
+            # locked», а первая запись ждёт освобождения базы.
+            tasks.filter(
+                due_date__lt=now,
+                status__in=['todo', 'in_progress'],
+                original_status__isnull=True
+            ).update(
+                status='overdue',
+                original_status=models.F('status'),
+                updated_at=now
+            )
+            overdue = list(tasks.filter(
+                due_date__lt=now,
+                status='overdue',
+                original_status__in=['todo', 'in_progress'],
+                updated_at=now
+            ).values_list('pk', 'original_status'))
+            overdue_ids = [pk for pk, status in overdue]
+            record_transitions(
+                request.user.pk, overdue, 'overdue', now, tasks.db
+            )
+            record_changes(
+                request.user.pk, overdue_ids, 'upsert', using=tasks.db
+            )
+            tasks_marked_overdue(request.user.pk, overdue_ids, now, tasks.db)
+        board = get_board(request.user)
 
+    columns = board_columns(board)
     context = {
-        'overdue_tasks': overdue_tasks,
-        'todo_tasks': todo_tasks,
-        'in_progress_tasks': in_progress_tasks,
-        'done_tasks': done_tasks,
-        'total_tasks': tasks.count(),
+        'overdue_tasks': columns['overdue'],
+        'todo_tasks': columns['todo'],
+        'in_progress_tasks': columns['in_progress'],
+        'done_tasks': columns['done'],
+        'total_tasks': len(board.cards),
+        'calendar_feed_url': request.build_absolute_uri(
+            reverse('calendar_feed', args=[feed_token(request.user)])
+        ),
+        'undo_delete': undo_delete_context(request),
     }
     return render(request, 'tasks/dashboard.html', context)
 
 
+def remember_deleted(request, pks):
+    request.session['undo_delete'] = {
+        'ids': pks,
+        'deleted_at': timezone.now().timestamp(),
+    }
+
+
+def undo_delete_context(request):
+    undo = request.session.get('undo_delete')
+    if not undo:
+        return None
+    deadline = task_restore_deadline().timestamp()
+    if undo['deleted_at'] < deadline:
+        del request.session['undo_delete']
+        return None
+    return {'count': len(undo['ids'])}
+
+
 @login_required
 def task_delete(request, pk):
-    task = get_object_or_404(Task, pk=pk, user=request.user)
-    task.delete()
+    task = get_object_or_404(Task.objects.for_user(request.user), pk=pk)
+    remember_deleted(request, soft_delete_tasks(request.user, [task.pk]))
     return redirect('dashboard')
 
 
+@login_required
+@require_POST
+def tasks_bulk_delete(request):
+    pks = [pk for pk in request.POST.getlist('task_ids') if pk.isdigit()]
+    if pks:
+        remember_deleted(request, soft_delete_tasks(request.user, pks))
+    return redirect('tasks_list')
+
+
+@login_required
+@require_POST
+def tasks_restore(request):
+    undo = request.session.pop('undo_delete', None)
+    if undo:
+        restore_tasks(request.user, undo['ids'])
+    if request.POST.get('next') == 'dashboard':
+        return redirect('dashboard')
+    return redirect('tasks_list')
+
+
 @login_required
 def analytics(request):
-    tasks = Task.objects.filter(user=request.user)
+    tasks = Task.objects.for_user(request.user)
     status_counts = {}
     for status, _ in Task.STATUS_CHOICES:
         status_counts[status] = tasks.filter(status=status).count()
@@ -67,11 +141,17 @@ def analytics(request):
     overdue_count = tasks.filter(
         status='overdue'
     ).count()
+    flow = flow_metrics(request.user, settings.ANALYTICS_FLOW_DAYS)
     context = {
         'status_counts': status_counts,
         'priority_counts': priority_counts,
         'overdue_count': overdue_count,
         'total_tasks': tasks.count(),
+        'flow': flow,
+        'time_in_status': [
+            (label, flow['time_in_status'][status])
+            for status, label in Task.STATUS_CHOICES
+        ],
     }
     return render(request, 'tasks/analytics.html', context)
 
@@ -81,6 +161,24 @@ def task_create(request):
     if request.method == 'POST':
         form = TaskForm(request.POST)
         if form.is_valid():
+            merge_target = request.POST.get('merge_into', '')
+            if merge_target.isdigit():
+                task = get_object_or_404(
+                    Task.objects.for_user(request.user), pk=merge_target
+                )
+                merge_into(
+                    task,
+                    form.cleaned_data['description'],
+                    form.cleaned_data['due_date']
+                )
+                return redirect('dashboard')
+            if not request.POST.get('allow_duplicate'):
+                duplicates = find_duplicates(
+                    request.user, form.cleaned_data['title']
+                )
+                if duplicates:
+                    context = {'form': form, 'duplicates': duplicates}
+                    return render(request, 'tasks/task_form.html', context)
             task = form.save(commit=False)
             task.user = request.user
             task.save()
@@ -99,7 +197,7 @@ def user_logout(request):
 
 @login_required
 def task_update(request, pk):
-    task = get_object_or_404(Task, pk=pk, user=request.user)
+    task = get_object_or_404(Task.objects.for_user(request.user), pk=pk)
     form = TaskForm(request.POST or None, instance=task)
 
     if request.method == 'POST' and form.is_valid():
@@ -122,7 +220,7 @@ def task_update(request, pk):
 @login_required
 @require_POST
 def update_task_status(request, pk):
-    task = get_object_or_404(Task, pk=pk, user=request.user)
+    task = get_object_or_404(Task.objects.for_user(request.user), pk=pk)
 
     try:
         data = json.loads(request.body)
@@ -159,21 +257,21 @@ def update_task_status(request, pk):
 def tasks_list(request):
     status = request.GET.get('status', None)
     sort_by = request.GET.get('sort', 'id')
-    tasks = Task.objects.filter(user=request.user)
+    condition = models.Q()
 
     if status == 'overdue':
-        tasks = tasks.filter(
+        condition = (
             models.Q(status='overdue') |
             models.Q(due_date__lt=timezone.now(), status__in=['todo', 'in_progress'])
         )
     elif status == 'todo':
-        tasks = tasks.filter(status='todo')
+        condition = models.Q(status='todo')
     elif status == 'in_progress':
-        tasks = tasks.filter(status='in_progress')
+        condition = models.Q(status='in_progress')
     elif status == 'done':
-        tasks = tasks.filter(status='done')
+        condition = models.Q(status='done')
 
-    tasks = tasks.order_by('due_date')
+    tasks = tasks_with_archive(request.user, condition)
 
     sort_mapping = {
         'id': 'id',
@@ -182,8 +280,8 @@ def tasks_list(request):
         '-title': '-title',
         'status': 'status',
         '-status': '-status',
-        'priority': 'priority',
-        '-priority': '-priority',
+        'priority': 'priority_rank',
+        '-priority': '-priority_rank',
         'due_date': 'due_date',
         '-due_date': '-due_date',
     }
@@ -210,12 +308,18 @@ def tasks_list(request):
         'current_label': current_label,
         'total_count': tasks.count(),
         'sort_by': sort_by,
+        'undo_delete': undo_delete_context(request),
     }
     return render(request, 'tasks/tasks_list.html', context)
 
 
 def task_detail(request, pk):
-    task = get_object_or_404(Task, pk=pk, user=request.user)
+    task = Task.objects.for_user(request.user).filter(pk=pk).first()
+    if task is None:
+        task = get_object_or_404(
+            ArchivedTask.objects.for_user(request.user), pk=pk
+        )
+    task.is_archived = isinstance(task, ArchivedTask)
     return render(request, 'tasks/task_detail.html', {'task': task})
 
 
@@ -239,7 +343,7 @@ def tasks_stats_api(request):
     else:
         start_date = None
 
-    tasks = Task.objects.filter(user=user)
+    tasks = Task.objects.for_user(user)
     if start_date:
         tasks = tasks.filter(created_at__gte=start_date)
 
@@ -255,62 +359,37 @@ def tasks_stats_api(request):
     })
 
 
+@login_required
+@require_GET
+def sync_tasks(request):
+    since = request.GET.get('since', '0')
+    limit = request.GET.get('limit', str(settings.TASK_SYNC_PAGE_SIZE))
+    if not since.isdigit() or not limit.isdigit() or not int(limit):
+        return JsonResponse(
+            {'success': False, 'error': 'Некорректные параметры синхронизации'},
+            status=400
+        )
+    limit = min(int(limit), settings.TASK_SYNC_PAGE_SIZE)
+    return JsonResponse({
+        'success': True,
+        **changes_since(request.user, int(since), limit)
+    })
+
+
 @login_required
 def export_tasks(request):
     status = request.GET.get('status', None)
     sort_by = request.GET.get('sort', 'id')
-    tasks = Task.objects.filter(user=request.user)
-
-    status_labels = {
-        'overdue': 'Просроченные',
-        'todo': 'К выполнению',
-        'in_progress': 'В работе',
-        'done': 'Выполненные',
-        None: 'Все задачи'
-    }
-    current_label = status_labels.get(status, 'Все задачи')
-
-    if status == 'overdue':
-        tasks = tasks.filter(
-            models.Q(status='overdue') |
-            models.Q(
-                due_date__lt=timezone.now(),
-                status__in=['todo', 'in_progress']
-            )
-        )
-    elif status:
-        tasks = tasks.filter(status=status)
-
-    sort_mapping = {
-        'id': 'id',
-        '-id': '-id',
-        'title': 'title',
-        '-title': '-title',
-        'status': 'status',
-        '-status': '-status',
-        'priority': 'priority',
-        '-priority': '-priority',
-        'due_date': 'due_date',
-        '-due_date': '-due_date',
-    }
-    order_field = sort_mapping.get(sort_by, 'id')
-    tasks = tasks.order_by(order_field)
+    tasks = export_queryset(request.user, status, sort_by)
 
     try:
         output = io.StringIO()
-        output.write(f"Экспорт задач (статус: {current_label})\n")
-        output.write("=" * 50 + "\n\n")
+        output.write(export_header(status))
 
         for task in tasks:
-            output.write(f"Задача: {task.title}\n")
-            output.write(f"Описание: {task.description}\n")
-            output.write(f"Срок: {task.due_date}\n")
-            output.write(f"Приоритет: {task.get_priority_display()}\n")
-            output.write(f"Статус: {task.get_status_display()}\n")
-            output.write(f"Пользователь: {task.user.username}\n")
-            output.write("-" * 50 + "\n")
+            output.write(export_task(task, request.user.username))
 
-        filename = f"export_tasks_{status or 'all'}.txt"
+        filename = export_filename(status)
 
         response = HttpResponse(
             output.getvalue(),
@@ -325,6 +404,111 @@ def export_tasks(request):
         )
 
 
+@login_required
+@require_POST
+def export_job_create(request):
+    status = request.POST.get('status') or ''
+    if status and status not in dict(Task.STATUS_CHOICES):
+        return JsonResponse({
+            'success': False,
+            'error': 'Неверный статус'
+        }, status=400)
+    sort = request.POST.get('sort') or 'id'
+    if sort not in SORT_MAPPING:
+        return JsonResponse({
+            'success': False,
+            'error': 'Неверная сортировка'
+        }, status=400)
+
+    active_jobs = ExportJob.objects.filter(
+        user=request.user,
+        state__in=['pending', 'running']
+    ).count()
+    if active_jobs >= settings.EXPORT_JOB_MAX_ACTIVE:
+        return JsonResponse({
+            'success': False,
+            'error': 'Слишком много активных экспортов. Дождитесь их завершения.'
+        }, status=429)
+
+    job = ExportJob.objects.create(
+        user=request.user,
+        status_filter=status,
+        sort=sort,
+    )
+    return JsonResponse({
+        'success': True,
+        'job_id': job.pk,
+        'status_url': reverse('export_job_status', args=[job.pk]),
+    }, status=202)
+
+
+@login_required
+@require_GET
+def export_job_status(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk, user=request.user)
+    data = {
+        'job_id': job.pk,
+        'state': job.state,
+        'rows_written': job.rows_written,
+        'error': job.error,
+    }
+    if job.state == 'done':
+        data['download_url'] = reverse('export_job_download', args=[job.pk])
+    return JsonResponse(data)
+
+
+@login_required
+@require_GET
+def export_job_download(request, pk):
+    job = get_object_or_404(
+        ExportJob, pk=pk, user=request.user, state='done'
+    )
+    if not job.file_path.exists():
+        raise Http404('Файл экспорта не найден')
+    return FileResponse(
+        open(job.file_path, 'rb'),
+        as_attachment=True,
+        filename=export_filename(job.status_filter or None) + '.gz',
+        content_type='application/gzip'
+    )
+
+
+@login_required
+@require_POST
+def calendar_feed_reset(request):
+    reset_feed_token(request.user)
+    return redirect('dashboard')
+
+
+@require_GET
+def calendar_feed(request, token):
+    user_id = user_id_from_token(token)
+    if user_id is None:
+        raise Http404('Календарь не найден')
+
+    version = feed_version(user_id)
+    last_modified = version['last_modified']
+    timestamp = int(last_modified.timestamp()) if last_modified else 0
+    stamp = int(last_modified.timestamp() * 1000000) if last_modified else 0
+    etag = f'"{user_id}-{stamp}-{version["count"]}"'
+
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=timestamp or None
+    )
+    if response is None:
+        response = StreamingHttpResponse(
+            calendar_stream(user_id),
+            content_type='text/calendar; charset=utf-8'
+        )
+    response['ETag'] = etag
+    if timestamp:
+        response['Last-Modified'] = http_date(timestamp)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 def auth_view(request):
     login_form = AuthenticationForm()
     register_form = RegistrationForm()